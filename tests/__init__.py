@@ -14,10 +14,14 @@
 
 """Helper functions for testing."""
 
+import argparse
 import inspect
 import os
+import typing
 import unittest
 
+from bdebstrap import Config, load_config, target_path
+
 
 def get_path(code_file: str) -> str:
     """Return relative or absolute path to given code file.
@@ -54,6 +58,36 @@ def get_source_files() -> list[str]:
     return files
 
 
+def build_base(args: argparse.Namespace, _: float, default_name: str, *__: typing.Any) -> bool:
+    """Mock build for base images: Create the target and config.yaml of the base."""
+    config = load_config(args, default_name)
+    assert config is not None
+    output_dir = os.path.join(args.output_base_dir, config["name"])
+    target = target_path(config, output_dir)
+    assert target is not None
+    config.set_source_date_epoch()
+    write_file(os.path.join(output_dir, "config.yaml"), config.dumps().encode())
+    write_file(target, b"")
+    return True
+
+
+def make_config(name: str = "example", **mmdebstrap: typing.Any) -> Config:
+    """Return a configuration with the given name and mmdebstrap options.
+
+    The suite defaults to unstable.
+    """
+    config = Config(mmdebstrap={"suite": "unstable", **mmdebstrap})
+    config["name"] = name
+    return config
+
+
+def write_file(path: str, content: bytes) -> None:
+    """Write the given content into the file (creating its directory)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as output:
+        output.write(content)
+
+
 def unittest_verbosity() -> int:
     """
     Return the verbosity setting of the currently running unittest.
@@ -0,0 +1,308 @@
+# Copyright (C) 2026 Benjamin Drung <bdrung@posteo.de>
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""Benchmark bdebstrap with fleet-scale configurations.
+
+Run it from the top directory: python3 -m tests.benchmark
+
+Store the results with --json and compare later runs against them with
+--baseline to catch performance regressions.
+"""
+
+import argparse
+import collections.abc
+import copy
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import typing
+
+import bdebstrap
+
+
+def write_package_config(directory: str, packages: int) -> str:
+    """Write a configuration YAML with the given number of packages."""
+    config_filename = os.path.join(directory, f"packages-{packages}.yaml")
+    with open(config_filename, "w", encoding="utf-8") as config_file:
+        config_file.write("---\nmmdebstrap:\n  packages:\n")
+        config_file.writelines(f"    - package{index}\n" for index in range(packages))
+    return config_filename
+
+
+def measure(
+    function: collections.abc.Callable[[], object],
+    number: int,
+    setup: collections.abc.Callable[[], object] | None = None,
+) -> float:
+    """Return the best time per call (in seconds) of five repetitions.
+
+    If setup is specified, it is called before each call and not measured.
+    """
+    if setup is None:
+        return min(timeit.repeat(function, number=number, repeat=5)) / number
+    durations = []
+    for _ in range(5):
+        duration = 0.0
+        for _ in range(number):
+            setup()
+            start = time.perf_counter()
+            function()
+            duration += time.perf_counter() - start
+        durations.append(duration)
+    return min(durations) / number
+
+
+def package_list(packages: int) -> list[str]:
+    """Return a realistic package list with APT patterns, local .debs, and duplicates."""
+    result = []
+    for index in range(packages):
+        if index % 50 == 0:
+            result.append(f"?and(?name(lib{index}),?architecture(native))")
+        elif index % 40 == 0:
+            result.append(f"./debs/local{index}_1.0-1_amd64.deb")
+        elif index % 20 == 0:
+            result.append(f"package{index}=1.{index}-1")
+        elif index % 10 == 0:
+            result.append(f"package{index}/bookworm-backports")
+        elif index % 100 == 1:
+            result.append("")
+        else:
+            result.append(f"package{index % (packages // 2 or 1)}")
+    return result
+
+
+def package_config(packages: int) -> bdebstrap.Config:
+    """Return a configuration with the given number of packages and hooks."""
+    config = bdebstrap.Config(
+        mmdebstrap={
+            "aptopts": ['Acquire::Languages "none"'],
+            "customize-hooks": [
+                f'echo "hook {index}" > "$1/etc/hook{index}"' for index in range(packages // 10)
+            ],
+            "hostname": "example",
+            "keyrings": ["/usr/share/keyrings/debian-archive-keyring.gpg"],
+            "mirrors": ["http://deb.debian.org/debian"],
+            "packages": [f"package{index}" for index in range(packages)],
+            "setup-hooks": [f"copy-in /etc/file{index} /etc" for index in range(packages // 10)],
+            "suite": "bookworm",
+            "target": "root.tar.xz",
+            "variant": "minbase",
+        }
+    )
+    config["name"] = "benchmark"
+    config["env"] = {"SOURCE_DATE_EPOCH": 1700000000}
+    return config
+
+
+def benchmark_config_load(directory: str, packages: int) -> list[tuple[str, float]]:
+    """Benchmark loading a configuration with the given number of packages."""
+    config_filename = write_package_config(directory, packages)
+    cache_dir = os.path.join(directory, "config-cache")
+
+    def safe_load() -> None:
+        bdebstrap._PARSED_YAML.clear()  # pylint: disable=protected-access
+        bdebstrap.load_yaml(config_filename)
+
+    def disk_cached_load() -> None:
+        bdebstrap._PARSED_YAML.clear()  # pylint: disable=protected-access
+        bdebstrap.load_yaml(config_filename, cache_dir)
+
+    def cached_load() -> None:
+        bdebstrap.load_yaml(config_filename)
+
+    disk_cached_load()
+    return [
+        (f"load {packages} packages (safe loader)", measure(safe_load, 3)),
+        (f"load {packages} packages (on-disk cache)", measure(disk_cached_load, 10)),
+        (f"load {packages} packages (in-memory cache)", measure(cached_load, 10)),
+    ]
+
+
+def benchmark_dict_merge(packages: int, overlays: int = 10) -> list[tuple[str, float]]:
+    """Benchmark merging many overlay configurations (like multiple --config)."""
+    fragments = [
+        {
+            "env": {f"VARIABLE{overlay}": "value"},
+            "mmdebstrap": {
+                "customize-hooks": [f"echo {overlay}-{index}" for index in range(100)],
+                "mirrors": [f"http://mirror{overlay}.example.com/debian"],
+                "packages": [f"package{overlay}-{index}" for index in range(packages // overlays)],
+            },
+        }
+        for overlay in range(overlays)
+    ]
+    copies: list[list[dict[str, typing.Any]]] = []
+
+    def setup() -> None:
+        copies[:] = [copy.deepcopy(fragments)]
+
+    def merge() -> None:
+        config = bdebstrap.Config()
+        for fragment in copies[0]:
+            bdebstrap.dict_merge(config, fragment)
+
+    return [(f"dict_merge {overlays} overlays, {packages} packages", measure(merge, 5, setup))]
+
+
+def benchmark_sanitize_packages(packages: int) -> list[tuple[str, float]]:
+    """Benchmark sanitizing a package list with APT patterns and local .debs."""
+    package_lists = package_list(packages)
+    configs: list[bdebstrap.Config] = []
+
+    def setup() -> None:
+        configs[:] = [bdebstrap.Config(mmdebstrap={"packages": list(package_lists)})]
+
+    def sanitize() -> None:
+        configs[0].sanitize_packages()
+
+    return [(f"sanitize_packages {packages} packages", measure(sanitize, 5, setup))]
+
+
+def benchmark_mmdebstrap(packages: int) -> list[tuple[str, float]]:
+    """Benchmark constructing and escaping the mmdebstrap command line."""
+    mmdebstrap = bdebstrap.Mmdebstrap(package_config(packages))
+    cmd = mmdebstrap.construct_parameters("/output")
+    return [
+        (
+            f"construct_parameters {packages} packages",
+            measure(lambda: mmdebstrap.construct_parameters("/output"), 10),
+        ),
+        (f"escape_cmd {len(cmd)} arguments", measure(lambda: bdebstrap.escape_cmd(cmd), 10)),
+    ]
+
+
+def benchmark_config_save(directory: str, packages: int) -> list[tuple[str, float]]:
+    """Benchmark saving a configuration with the given number of packages."""
+    config = package_config(packages)
+    config_filename = os.path.join(directory, "config.yaml")
+    return [(f"Config.save {packages} packages", measure(lambda: config.save(config_filename), 3))]
+
+
+def benchmark_startup(directory: str) -> list[tuple[str, float]]:
+    """Benchmark the import time and the wall-clock startup time of bdebstrap.
+
+    For the no-op build, mmdebstrap is replaced by true to only measure the
+    overhead of bdebstrap itself.
+    """
+    top_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = os.path.join(top_dir, "bdebstrap")
+    env = dict(os.environ, PYTHONPATH=top_dir)
+    importtime = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import bdebstrap"],
+        capture_output=True,
+        check=True,
+        env=env,
+        text=True,
+    )
+    # The last line contains the cumulative import time of bdebstrap in microseconds.
+    import_duration = int(importtime.stderr.splitlines()[-1].split("|")[1]) / 1e6
+
+    bin_dir = os.path.join(directory, "bin")
+    os.makedirs(bin_dir, exist_ok=True)
+    if not os.path.lexists(os.path.join(bin_dir, "mmdebstrap")):
+        os.symlink(shutil.which("true") or "/bin/true", os.path.join(bin_dir, "mmdebstrap"))
+    noop_env = dict(env, PATH=f"{bin_dir}:{os.environ.get('PATH', '')}")
+    noop_cmd = [sys.executable, script, "--force", "--name", "noop", "-b", directory, "unstable"]
+
+    def help_startup() -> None:
+        subprocess.run(
+            [sys.executable, script, "--help"], check=True, env=env, stdout=subprocess.DEVNULL
+        )
+
+    def noop_build() -> None:
+        subprocess.run(noop_cmd, check=True, env=noop_env, stderr=subprocess.DEVNULL)
+
+    return [
+        ("import bdebstrap (python -X importtime)", import_duration),
+        ("bdebstrap --help (wall-clock)", measure(help_startup, 3)),
+        ("bdebstrap no-op build (wall-clock)", measure(noop_build, 3)),
+    ]
+
+
+def run_benchmarks(args: argparse.Namespace) -> dict[str, float]:
+    """Run all benchmarks. Return the durations (in seconds) by benchmark name."""
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bdebstrap-benchmark-") as directory:
+        for packages in args.packages:
+            results += benchmark_config_load(directory, packages)
+            results += benchmark_dict_merge(packages)
+            results += benchmark_sanitize_packages(packages)
+            results += benchmark_mmdebstrap(packages)
+            results += benchmark_config_save(directory, packages)
+        if not args.skip_startup:
+            results += benchmark_startup(directory)
+    return dict(results)
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], tolerance: float) -> int:
+    """Print the results compared to the baseline. Return the number of regressions."""
+    width = max(len(name) for name in results)
+    regressions = 0
+    for name, duration in results.items():
+        line = f"{name:<{width}}  {duration * 1000:10.3f} ms"
+        if name in baseline and baseline[name] > 0:
+            change = duration / baseline[name] - 1
+            line += f"  {change:+8.1%}"
+            if change > tolerance:
+                line += "  REGRESSION"
+                regressions += 1
+        print(line)
+    return regressions
+
+
+def main(argv: list[str]) -> int:
+    """Run the benchmarks and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--packages",
+        type=int,
+        nargs="+",
+        default=[10000, 100000],
+        help="Number of packages in the configurations (default: %(default)s)",
+    )
+    parser.add_argument("--json", metavar="FILE", help="Store the results as JSON in FILE.")
+    parser.add_argument(
+        "--baseline",
+        metavar="FILE",
+        help="Compare the results with the JSON results in FILE and fail on regressions.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown compared to the baseline (default: %(default)s)",
+    )
+    parser.add_argument("--skip-startup", action="store_true", help="Skip the startup benchmarks.")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+    regressions = compare(results, baseline, args.tolerance)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as json_file:
+            json.dump(results, json_file, indent=2)
+            json_file.write("\n")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,265 @@
+# Copyright (C) 2026 Benjamin Drung <bdrung@posteo.de>
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""Test BuildCache, CheckpointCache, and ResolutionCache class of bdebstrap."""
+
+import io
+import os
+import subprocess
+import tempfile
+import unittest
+import unittest.mock
+from unittest.mock import MagicMock
+
+from bdebstrap import BuildCache, CheckpointCache, ResolutionCache, build_cache, parse_args
+
+from . import make_config
+
+
+def mmdebstrap_version(*args: str, **kwargs: str) -> subprocess.CompletedProcess[str]:
+    """Mock subprocess.run for calling mmdebstrap --version."""
+    assert not kwargs.get("shell")
+    return subprocess.CompletedProcess(args, 0, "mmdebstrap 1.4.3\n", "")
+
+
+@unittest.mock.patch("subprocess.run", mmdebstrap_version)
+@unittest.mock.patch("urllib.request.urlopen")
+class TestBuildCache(unittest.TestCase):
+    """
+    This unittest class tests the BuildCache object.
+    """
+
+    TMP_PREFIX = "bdebstrap-"
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory(  # pylint: disable=consider-using-with
+            prefix=self.TMP_PREFIX
+        )
+        self.cache = BuildCache(os.path.join(self.tmpdir.name, "cache"))
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_mirror_index_urls(self, urlopen_mock: MagicMock) -> None:
+        """Test determining the InRelease URLs of the mirrors."""
+        config = make_config(
+            target="root.tar.xz",
+            mirrors=[
+                "http://deb.debian.org/debian",
+                "deb [arch=amd64 signed-by=/key.gpg] http://security.debian.org/ bookworm main",
+                "deb file:///srv/repo ./",
+            ],
+        )
+        self.assertEqual(
+            self.cache.mirror_index_urls(config),
+            [
+                "http://deb.debian.org/debian/dists/unstable/InRelease",
+                "http://security.debian.org/dists/bookworm/InRelease",
+                "file:///srv/repo/./InRelease",
+            ],
+        )
+        urlopen_mock.assert_not_called()
+
+    def test_unknown_mirror(self, urlopen_mock: MagicMock) -> None:
+        """Test not using the cache for a sources.list file as mirror."""
+        config = make_config(target="root.tar.xz", mirrors=["/etc/apt/sources.list"])
+        with self.assertLogs("bdebstrap", level="WARNING") as context_manager:
+            self.assertIsNone(self.cache.fingerprint(config))
+        self.assertIn("Cannot determine the mirror indexes", context_manager.output[-1])
+        urlopen_mock.assert_not_called()
+
+    def test_stdout_target(self, urlopen_mock: MagicMock) -> None:
+        """Test not using the cache for sending the tarball to stdout."""
+        config = make_config(target="-")
+        with self.assertLogs("bdebstrap", level="WARNING") as context_manager:
+            self.assertIsNone(self.cache.fingerprint(config))
+        self.assertIn("not placed in the output directory", context_manager.output[-1])
+        urlopen_mock.assert_not_called()
+
+    def test_fingerprint(self, urlopen_mock: MagicMock) -> None:
+        """Test that the fingerprint covers referenced hook files and the mirror state."""
+        urlopen_mock.side_effect = lambda *args, **kwargs: io.BytesIO(b"Date: today\n")
+        hook = os.path.join(self.tmpdir.name, "hook")
+        with open(hook, "w", encoding="utf-8") as hook_file:
+            hook_file.write("#!/bin/sh\n")
+        config = make_config(target="root.tar.xz")
+        config["mmdebstrap"]["customize-hooks"] = [f'{hook} "$1"']
+        fingerprint = self.cache.fingerprint(config)
+        self.assertRegex(fingerprint or "", "^[0-9a-f]{64}$")
+        self.assertEqual(self.cache.fingerprint(config), fingerprint)
+
+        with open(hook, "a", encoding="utf-8") as hook_file:
+            hook_file.write("true\n")
+        changed_hook = self.cache.fingerprint(config)
+        self.assertNotEqual(changed_hook, fingerprint)
+
+        urlopen_mock.side_effect = lambda *args, **kwargs: io.BytesIO(b"Date: tomorrow\n")
+        self.assertNotIn(self.cache.fingerprint(config), {fingerprint, changed_hook})
+        urlopen_mock.assert_called_with(
+            "http://deb.debian.org/debian/dists/unstable/InRelease", timeout=60
+        )
+
+    def test_fingerprint_options(self, urlopen_mock: MagicMock) -> None:
+        """Test that the fingerprint covers the options that change the output."""
+        urlopen_mock.side_effect = lambda *args, **kwargs: io.BytesIO(b"Date: today\n")
+        cache_dir = os.path.join(self.tmpdir.name, "cache")
+        fingerprints = set()
+        for options in (
+            [],
+            ["--export-bundle"],
+            ["--timings"],
+            ["--checksums"],
+            ["--cgroup"],
+            ["--memory-max", "1G"],
+            ["--memory-max", "2G"],
+        ):
+            cache = build_cache(parse_args(["--cache-dir", cache_dir] + options))
+            assert cache is not None
+            fingerprints.add(cache.fingerprint(make_config(target="root.tar.xz")))
+        self.assertEqual(len(fingerprints), 7)
+
+    def test_replay_bundle(self, urlopen_mock: MagicMock) -> None:
+        """Test not using the cache when replaying a bundle."""
+        bundle = os.path.join(self.tmpdir.name, "bundle")
+        for subdir in ("archives", "lists"):
+            os.makedirs(os.path.join(bundle, subdir))
+        args = parse_args(["--cache-dir", self.tmpdir.name, "--replay-bundle", bundle])
+        with self.assertLogs("bdebstrap", level="INFO") as context_manager:
+            self.assertIsNone(build_cache(args))
+        self.assertIn(f"replayed from '{bundle}'", context_manager.output[0])
+        urlopen_mock.assert_not_called()
+
+    def test_fingerprint_unreachable_mirror(self, urlopen_mock: MagicMock) -> None:
+        """Test not using the cache if the mirror cannot be reached."""
+        urlopen_mock.side_effect = OSError(101, "Network is unreachable")
+        with self.assertLogs("bdebstrap", level="WARNING") as context_manager:
+            self.assertIsNone(self.cache.fingerprint(make_config(target="root.tar.xz")))
+        self.assertIn("Failed to fetch", context_manager.output[-1])
+        self.assertEqual(urlopen_mock.call_count, 2)
+
+    def test_store_and_restore(self, urlopen_mock: MagicMock) -> None:
+        """Test storing an output directory and restoring it."""
+        output = os.path.join(self.tmpdir.name, "output")
+        os.makedirs(output)
+        with open(os.path.join(output, "manifest"), "w", encoding="utf-8") as manifest:
+            manifest.write("bash\t5.2.15-2+b2\n")
+        restored = os.path.join(self.tmpdir.name, "restored")
+        os.makedirs(restored)
+
+        self.assertFalse(self.cache.restore("0123abcd", restored))
+        self.cache.store("0123abcd", output)
+        self.assertTrue(self.cache.restore("0123abcd", restored))
+        self.assertEqual(os.listdir(restored), ["manifest"])
+        self.assertTrue(
+            os.path.samefile(os.path.join(output, "manifest"), os.path.join(restored, "manifest"))
+        )
+        urlopen_mock.assert_not_called()
+
+
+@unittest.mock.patch("subprocess.run", mmdebstrap_version)
+@unittest.mock.patch("urllib.request.urlopen")
+class TestCheckpointCache(unittest.TestCase):
+    """
+    This unittest class tests the CheckpointCache object.
+    """
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmpdir.cleanup)
+        self.checkpoints = CheckpointCache(os.path.join(self.tmpdir.name, "checkpoints"))
+
+    def test_fingerprint(self, urlopen_mock: MagicMock) -> None:
+        """Test that the fingerprint only covers the stages up to the package installation."""
+        urlopen_mock.side_effect = lambda *args, **kwargs: io.BytesIO(b"Date: today\n")
+        config = make_config(target="root.tar.xz", packages=["vim"])
+        fingerprint = self.checkpoints.fingerprint(config)
+        self.assertRegex(fingerprint or "", "^[0-9a-f]{64}$")
+
+        config["mmdebstrap"]["customize-hooks"] = ["rm -f $1/etc/motd"]
+        config["mmdebstrap"]["cleanup-hooks"] = ["rm -f $1/etc/hostname"]
+        config["mmdebstrap"]["hostname"] = "example"
+        config["mmdebstrap"]["target"] = "root.squashfs"
+        self.assertEqual(self.checkpoints.fingerprint(config), fingerprint)
+
+        config["mmdebstrap"]["packages"].append("less")
+        self.assertNotEqual(self.checkpoints.fingerprint(config), fingerprint)
+
+    def test_fingerprint_skip(self, urlopen_mock: MagicMock) -> None:
+        """Test that changing the skipped steps invalidates the checkpoint."""
+        urlopen_mock.side_effect = lambda *args, **kwargs: io.BytesIO(b"Date: today\n")
+        config = make_config(target="root.tar.xz", packages=["vim"])
+        fingerprint = self.checkpoints.fingerprint(config)
+        config["mmdebstrap"]["skip"] = ["essential/unlink"]
+        skipped = self.checkpoints.fingerprint(config)
+        self.assertNotIn(skipped, {fingerprint, None})
+        config["mmdebstrap"]["skip"] = ["download/empty"]
+        self.assertNotIn(self.checkpoints.fingerprint(config), {fingerprint, skipped, None})
+
+    def test_hook_dirs(self, urlopen_mock: MagicMock) -> None:
+        """Test not using checkpoints with hook directories."""
+        config = make_config(target="root.tar.xz")
+        config["mmdebstrap"]["hook-dirs"] = ["/usr/share/mmdebstrap/hooks/merged-usr"]
+        with self.assertLogs("bdebstrap", level="INFO") as context_manager:
+            self.assertIsNone(self.checkpoints.fingerprint(config))
+        self.assertIn("hook-dirs are not supported", context_manager.output[-1])
+        urlopen_mock.assert_not_called()
+
+    def test_checkpoint(self, urlopen_mock: MagicMock) -> None:
+        """Test restoring an existing snapshot."""
+        checkpoint = self.checkpoints.checkpoint("0123abcd")
+        self.assertEqual(checkpoint.path, os.path.join(self.checkpoints.cache_dir, "0123abcd.tar"))
+        self.assertFalse(checkpoint.restore)
+        with open(checkpoint.path, "wb"):
+            pass
+        self.assertTrue(self.checkpoints.checkpoint("0123abcd").restore)
+        urlopen_mock.assert_not_called()
+
+
+@unittest.mock.patch("subprocess.run", mmdebstrap_version)
+@unittest.mock.patch("urllib.request.urlopen")
+class TestResolutionCache(unittest.TestCase):
+    """
+    This unittest class tests the ResolutionCache object.
+    """
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmpdir.cleanup)
+        self.resolutions = ResolutionCache(os.path.join(self.tmpdir.name, "resolutions"))
+
+    def test_fingerprint(self, urlopen_mock: MagicMock) -> None:
+        """Test that the fingerprint only covers the inputs of the resolution."""
+        urlopen_mock.side_effect = lambda *args, **kwargs: io.BytesIO(b"Date: today\n")
+        config = make_config(target="root.tar.xz", packages=["vim"])
+        config["env"] = {"BUILD_ID": "1"}
+        fingerprint = self.resolutions.fingerprint(config)
+        self.assertRegex(fingerprint or "", "^[0-9a-f]{64}$")
+
+        config["name"] = "other"
+        config["env"]["BUILD_ID"] = "2"
+        config["mmdebstrap"]["customize-hooks"] = ["rm -f $1/etc/motd"]
+        self.assertEqual(self.resolutions.fingerprint(config), fingerprint)
+
+        config["env"]["APT_CONFIG"] = "/etc/apt/custom.conf"
+        self.assertNotIn(self.resolutions.fingerprint(config), {fingerprint, None})
+
+    def test_fingerprint_setup_hooks(self, urlopen_mock: MagicMock) -> None:
+        """Test that the fingerprint covers the whole environment of setup hooks."""
+        urlopen_mock.side_effect = lambda *args, **kwargs: io.BytesIO(b"Date: today\n")
+        config = make_config(target="root.tar.xz")
+        config["mmdebstrap"]["setup-hooks"] = ['echo "$PROXY" > "$1/proxy"']
+        config["env"] = {"PROXY": "http://proxy:3128"}
+        fingerprint = self.resolutions.fingerprint(config)
+        config["env"]["PROXY"] = "http://other:3128"
+        self.assertNotIn(self.resolutions.fingerprint(config), {fingerprint, None})
@@ -0,0 +1,161 @@
+# Copyright (C) 2026 Benjamin Drung <bdrung@posteo.de>
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""Test running the builds of bdebstrap in their own cgroup."""
+
+import contextlib
+import io
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import unittest
+import unittest.mock
+
+from bdebstrap import Cgroup, Config, Mmdebstrap, parse_args, parse_size, requested_cgroup_limits
+
+
+class TestCgroup(unittest.TestCase):
+    """
+    This unittest class tests the Cgroup class and the cgroup options.
+    """
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_parse_args(self) -> None:
+        """Test that the cgroup limits imply --cgroup."""
+        args = parse_args(["--memory-max", "2G", "--cpu-weight", "50"])
+        self.assertTrue(args.cgroup)
+        self.assertEqual(requested_cgroup_limits(args), {"cpu_weight": 50, "memory_max": 2 << 30})
+        self.assertIsNone(requested_cgroup_limits(parse_args([])))
+
+    def test_parse_args_invalid_weight(self) -> None:
+        """Test that the IO weight needs to be between 1 and 10000."""
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr), self.assertRaises(SystemExit):
+            parse_args(["--io-weight", "0"])
+        self.assertIn("io weight needs to be between 1 and 10000", stderr.getvalue())
+
+    def test_parse_size(self) -> None:
+        """Test parse_size() with and without suffix."""
+        self.assertEqual(parse_size("4096"), 4096)
+        self.assertEqual(parse_size("512M"), 512 << 20)
+        self.assertEqual(parse_size("1 GiB"), 1 << 30)
+        with self.assertRaises(ValueError):
+            parse_size("1.5G")
+
+    def test_create_directory(self) -> None:
+        """Test creating a cgroup directly in the cgroup filesystem."""
+        with open(os.path.join(self.tmpdir.name, "cgroup.controllers"), "w", encoding="utf-8"):
+            pass
+        with unittest.mock.patch("bdebstrap.CGROUP_ROOT", self.tmpdir.name), unittest.mock.patch(
+            "bdebstrap.own_cgroup", unittest.mock.MagicMock(return_value="/")
+        ), unittest.mock.patch("os.path.isdir", unittest.mock.MagicMock(return_value=False)):
+            cgroup = Cgroup.create("debian/unstable", {"io_weight": 200, "memory_max": 1 << 30})
+        assert cgroup is not None
+        self.assertEqual(
+            os.path.basename(cgroup.path),
+            f"bdebstrap-debian_unstable-{os.getpid()}-{threading.get_ident()}",
+        )
+        with open(os.path.join(self.tmpdir.name, "cgroup.subtree_control"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "+memory")
+        with open(os.path.join(cgroup.path, "io.weight"), encoding="utf-8") as io_weight:
+            self.assertEqual(io_weight.read(), "default 200")
+        with open(os.path.join(cgroup.path, "memory.max"), encoding="utf-8") as memory_max:
+            self.assertEqual(memory_max.read(), "1073741824")
+        # The check moved a shell into the cgroup.
+        with open(os.path.join(cgroup.path, "cgroup.procs"), encoding="utf-8") as procs:
+            self.assertRegex(procs.read(), r"^\d+\n$")
+        for filename in ("cgroup.procs", "io.weight", "memory.max"):
+            os.remove(os.path.join(cgroup.path, filename))
+        cgroup.remove()
+        self.assertFalse(os.path.exists(cgroup.path))
+
+    def test_create_concurrent(self) -> None:
+        """Test that concurrent builds of the same image get different cgroups."""
+        with open(os.path.join(self.tmpdir.name, "cgroup.controllers"), "w", encoding="utf-8"):
+            pass
+        cgroups = []
+        with unittest.mock.patch("bdebstrap.CGROUP_ROOT", self.tmpdir.name), unittest.mock.patch(
+            "bdebstrap.own_cgroup", unittest.mock.MagicMock(return_value="/")
+        ), unittest.mock.patch("os.path.isdir", unittest.mock.MagicMock(return_value=False)):
+            thread = threading.Thread(target=lambda: cgroups.append(Cgroup.create("example", {})))
+            thread.start()
+            cgroups.append(Cgroup.create("example", {}))
+            thread.join()
+        paths = {cgroup.path for cgroup in cgroups if cgroup is not None}
+        self.assertEqual(len(paths), 2)
+
+    def test_create_without_cgroup_v2(self) -> None:
+        """Test falling back if cgroup v2 is not available."""
+        with unittest.mock.patch("bdebstrap.CGROUP_ROOT", self.tmpdir.name), self.assertLogs(
+            "bdebstrap", level="WARNING"
+        ) as logs:
+            self.assertIsNone(Cgroup.create("example", {}))
+        self.assertIn("cgroup v2 is not available", logs.output[0])
+
+    def test_command(self) -> None:
+        """Test running a command in the cgroup."""
+        cgroup = Cgroup(self.tmpdir.name)
+        output = subprocess.check_output(cgroup.command(["echo", "hello"]))
+        self.assertEqual(output, b"hello\n")
+        with open(os.path.join(self.tmpdir.name, "cgroup.procs"), encoding="utf-8") as procs:
+            self.assertRegex(procs.read(), r"^\d+\n$")
+
+    def test_usage(self) -> None:
+        """Test reading the resource usage from the cgroup interface files."""
+        files = {
+            "cpu.stat": "usage_usec 12500000\nuser_usec 10000000\nsystem_usec 2500000\n",
+            "memory.peak": "734003200\n",
+            "io.stat": "8:0 rbytes=1000 wbytes=2000 rios=3 wios=4\n"
+            "259:0 rbytes=24 wbytes=48 rios=1 wios=2 dbytes=0 dios=0\n",
+        }
+        for filename, content in files.items():
+            with open(os.path.join(self.tmpdir.name, filename), "w", encoding="utf-8") as f:
+                f.write(content)
+        self.assertEqual(
+            Cgroup(self.tmpdir.name).usage(),
+            {
+                "cpu_seconds": 12.5,
+                "memory_peak_bytes": 734003200,
+                "io_read_bytes": 1024,
+                "io_write_bytes": 2048,
+            },
+        )
+
+    def test_usage_missing_controllers(self) -> None:
+        """Test reading the resource usage without memory and io controller."""
+        with open(os.path.join(self.tmpdir.name, "cpu.stat"), "w", encoding="utf-8") as cpu_stat:
+            cpu_stat.write("usage_usec 1000\n")
+        self.assertEqual(Cgroup(self.tmpdir.name).usage(), {"cpu_seconds": 0.001})
+
+    @unittest.mock.patch("bdebstrap.Cgroup.create", unittest.mock.MagicMock(return_value=None))
+    @unittest.mock.patch("subprocess.check_call")
+    def test_call_without_cgroup(self, check_call_mock: unittest.mock.MagicMock) -> None:
+        """Test recording the resource usage of the child processes without cgroup."""
+        config = Config(mmdebstrap={"suite": "unstable", "target": "x.tar"})
+        config["name"] = "example"
+        Mmdebstrap(config, cgroup_limits={"cpu_weight": 10}).call(self.tmpdir.name)
+        self.assertEqual(check_call_mock.call_args[0][0][0], "mmdebstrap")
+        with open(os.path.join(self.tmpdir.name, "resources.json"), encoding="utf-8") as f:
+            resources = json.load(f)
+        self.assertEqual(resources["cgroup"], None)
+        self.assertEqual(resources["limits"], {"cpu_weight": 10})
+        self.assertEqual(
+            set(resources["usage"]),
+            {"cpu_seconds", "io_read_bytes", "io_write_bytes", "memory_peak_bytes"},
+        )
@@ -0,0 +1,145 @@
+# Copyright (C) 2026 Benjamin Drung <bdrung@posteo.de>
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""Test checking the package selections of configurations (check subcommand)."""
+
+import contextlib
+import io
+import os
+import subprocess
+import tempfile
+import typing
+import unittest
+import unittest.mock
+
+from bdebstrap import (
+    CheckResult,
+    check_configs,
+    format_check_results,
+    main,
+    resolution_problems,
+)
+
+from . import make_config
+
+UNMET_OUTPUT = """\
+Reading package lists...
+Building dependency tree...
+Some packages could not be installed. This may mean that you have
+requested an impossible situation.
+
+The following packages have unmet dependencies:
+ libfoo1 : Depends: libbar2 (>= 2.0) but 1.0-1 is to be installed
+           Breaks: baz (< 3)
+ qux : Conflicts: libfoo1
+E: Unable to correct problems, you have held broken packages.
+"""
+
+
+def apt_get(cmd: list[str], **_: typing.Any) -> subprocess.CompletedProcess[str]:
+    """Simulate apt-get install --simulate (failing for the package 'broken')."""
+    if "broken" in cmd:
+        return subprocess.CompletedProcess(cmd, 100, stdout="E: Unable to locate package broken\n")
+    return subprocess.CompletedProcess(cmd, 0, stdout="Inst vim (2:9.1 Debian:unstable)\n")
+
+
+class TestCheck(unittest.TestCase):
+    """
+    This unittest class tests the check subcommand.
+    """
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_resolution_problems(self) -> None:
+        """Test extracting the unmet dependencies from the output of apt-get."""
+        self.assertEqual(
+            resolution_problems(UNMET_OUTPUT),
+            [
+                "libfoo1 : Depends: libbar2 (>= 2.0) but 1.0-1 is to be installed",
+                "libfoo1 : Breaks: baz (< 3)",
+                "qux : Conflicts: libfoo1",
+            ],
+        )
+        self.assertEqual(
+            resolution_problems("E: Unable to locate package nonexistent\n"),
+            ["Unable to locate package nonexistent"],
+        )
+
+    def test_format_check_results(self) -> None:
+        """Test printing one line per problem."""
+        results = [
+            CheckResult("minimal", [], True),
+            CheckResult("desktop", ["qux : Conflicts: libfoo1", "Unable to locate package x"]),
+        ]
+        self.assertEqual(
+            format_check_results(results),
+            "NAME     RESULT         PROBLEMS\n"
+            "minimal  PASS (cached)\n"
+            "desktop  FAIL           qux : Conflicts: libfoo1\n"
+            "                        Unable to locate package x\n",
+        )
+
+    @unittest.mock.patch("subprocess.run", side_effect=apt_get)
+    @unittest.mock.patch("bdebstrap.prepare_skeleton", return_value=None)
+    def test_check_configs(
+        self, prepare_skeleton: unittest.mock.MagicMock, run: unittest.mock.MagicMock
+    ) -> None:
+        """Test sharing the package indexes and caching the outcomes."""
+        configs = [
+            make_config("a", packages=["vim"], variant="custom"),
+            make_config("b", packages=["broken"], variant="custom"),
+            make_config("c", suite="bookworm", packages=["vim"], variant="custom"),
+        ]
+        with unittest.mock.patch(
+            "bdebstrap.ResolutionCache.fingerprint",
+            side_effect=lambda c: f"fingerprint-{c['name']}",
+        ):
+            results = check_configs(configs, 2, self.tmpdir.name)
+            self.assertEqual(
+                results,
+                [
+                    CheckResult("a", []),
+                    CheckResult("b", ["Unable to locate package broken"]),
+                    CheckResult("c", []),
+                ],
+            )
+            # One apt skeleton per suite
+            self.assertEqual(
+                sorted(call.args[0]["name"] for call in prepare_skeleton.call_args_list),
+                ["a", "c"],
+            )
+            self.assertEqual(run.call_count, 3)
+
+            prepare_skeleton.reset_mock()
+            results = check_configs(configs, 2, self.tmpdir.name)
+        self.assertEqual([result.cached for result in results], [True, True, True])
+        self.assertEqual(results[1].problems, ["Unable to locate package broken"])
+        prepare_skeleton.assert_not_called()
+
+    @unittest.mock.patch("bdebstrap.prepare_skeleton", return_value="Downloading failed.")
+    def test_check_main(self, _: unittest.mock.MagicMock) -> None:
+        """Test printing the table and failing if a configuration cannot be checked."""
+        config = os.path.join(self.tmpdir.name, "minimal.yaml")
+        with open(config, "w", encoding="utf-8") as config_file:
+            config_file.write("mmdebstrap:\n  suite: unstable\n  packages: [vim]\n")
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), self.assertLogs("bdebstrap", "ERROR") as logs:
+            self.assertEqual(main(["check", "-j", "1", config]), 1)
+        self.assertEqual(
+            stdout.getvalue(),
+            "NAME     RESULT  PROBLEMS\nminimal  FAIL    Downloading failed.\n",
+        )
+        self.assertEqual(logs.output, ["ERROR:bdebstrap:1 of 1 configurations failed the check."])
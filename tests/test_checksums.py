@@ -0,0 +1,120 @@
+# Copyright (C) 2026 Benjamin Drung <bdrung@posteo.de>
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""Test the checksums of the output files and the verify subcommand of bdebstrap."""
+
+import contextlib
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+from bdebstrap import Config, Mmdebstrap, main, sha256_files, write_checksums
+
+from . import write_file
+
+MANIFEST = b"vim\t2:9.0-1\n"
+
+
+def sha256(content: bytes) -> str:
+    """Return the SHA256 checksum of the given content."""
+    return hashlib.sha256(content).hexdigest()
+
+
+class TestChecksums(unittest.TestCase):
+    """
+    This unittest class tests writing and verifying the checksums of output files.
+    """
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmpdir.cleanup)
+        self.output_dir = os.path.join(self.tmpdir.name, "output")
+
+    def test_sha256_files(self) -> None:
+        """Test sha256_files() hashing files in parallel."""
+        write_file(os.path.join(self.output_dir, "empty"), b"")
+        write_file(os.path.join(self.output_dir, "manifest"), MANIFEST)
+        results = sha256_files(
+            [os.path.join(self.output_dir, f) for f in ("empty", "manifest", "missing")], 2
+        )
+        self.assertEqual(results[:2], [sha256(b""), sha256(MANIFEST)])
+        self.assertIsInstance(results[2], FileNotFoundError)
+
+    def test_write_checksums(self) -> None:
+        """Test write_checksums() reusing known checksums and skipping directories."""
+        write_file(os.path.join(self.output_dir, "manifest"), MANIFEST)
+        write_file(os.path.join(self.output_dir, "boot", "vmlinuz"), b"kernel")
+        write_file(os.path.join(self.output_dir, "root", "etc", "hostname"), b"example\n")
+        write_file(os.path.join(self.output_dir, "root.tar"), b"tar")
+        write_file(os.path.join(self.output_dir, ".timings.log"), b"0.1 start\n")
+        write_checksums(
+            self.output_dir,
+            {os.path.join(self.output_dir, "root.tar"): "0" * 64},
+            {os.path.abspath(os.path.join(self.output_dir, "root"))},
+        )
+        with open(os.path.join(self.output_dir, "SHA256SUMS"), encoding="utf-8") as checksums:
+            self.assertEqual(
+                checksums.read(),
+                f"{sha256(b'kernel')}  boot/vmlinuz\n"
+                f"{sha256(MANIFEST)}  manifest\n"
+                f"{'0' * 64}  root.tar\n",
+            )
+
+    def test_call_compressed_checksums(self) -> None:
+        """Test Mmdebstrap hashing the compressed tarball while writing it."""
+        os.makedirs(self.output_dir)
+        target = os.path.join(self.output_dir, "root.tar.gz")
+        config = Config(mmdebstrap={"suite": "bookworm", "target": target})
+        config["compression"] = {"level": 1}
+        mmdebstrap = Mmdebstrap(config, checksums=True)
+        with unittest.mock.patch.object(
+            mmdebstrap, "construct_parameters", return_value=["printf", "tar stream"]
+        ), unittest.mock.patch("bdebstrap.sha256_files", return_value=[]) as sha256_files_mock:
+            mmdebstrap.call(self.output_dir)
+        sha256_files_mock.assert_called_once_with([])
+        with open(target, "rb") as tarball:
+            checksum = sha256(tarball.read())
+        with open(os.path.join(self.output_dir, "SHA256SUMS"), encoding="utf-8") as checksums:
+            self.assertEqual(checksums.read(), f"{checksum}  root.tar.gz\n")
+
+    def test_verify(self) -> None:
+        """Test verify subcommand for intact, modified, and incomplete outputs."""
+        outputs = [os.path.join(self.tmpdir.name, name) for name in ("good", "bad", "none")]
+        for output_dir in outputs[:2]:
+            write_file(os.path.join(output_dir, "manifest"), MANIFEST)
+            write_file(os.path.join(output_dir, "root.tar"), b"tar")
+            write_checksums(output_dir, {}, set())
+        write_file(os.path.join(outputs[1], "manifest"), b"vim\t2:9.1-1\n")
+        os.remove(os.path.join(outputs[1], "root.tar"))
+        os.makedirs(outputs[2])
+
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.assertEqual(main(["verify", "-j", "2", outputs[0]]), 0)
+            self.assertEqual(main(["verify", "--quiet"] + outputs), 1)
+        self.assertEqual(
+            stdout.getvalue().splitlines(),
+            [
+                f"{outputs[0]}: OK",
+                f"{outputs[1]}/manifest: FAILED",
+                f"{outputs[1]}/root.tar: FAILED open or read: No such file or directory",
+                f"{outputs[1]}: FAILED",
+                "Failed to read SHA256SUMS: [Errno 2] No such file or directory: "
+                f"'{outputs[2]}/SHA256SUMS'",
+                f"{outputs[2]}: FAILED",
+            ],
+        )
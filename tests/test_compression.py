@@ -0,0 +1,149 @@
+# Copyright (C) 2026 Benjamin Drung <bdrung@posteo.de>
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""Test compressing the target in bdebstrap."""
+
+import gzip
+import logging
+import os
+import subprocess
+import tempfile
+import unittest
+import unittest.mock
+
+from bdebstrap import Config, Mmdebstrap, __script_name__, compressor_command
+
+from . import make_config
+
+
+def compressed_config(target: str, **compression: str | int) -> Config:
+    """Return a configuration for the given target and compression settings."""
+    config = make_config(suite="bookworm", target=target)
+    config["compression"] = compression
+    return config
+
+
+class TestCompression(unittest.TestCase):
+    """
+    This unittest class tests compressing the target.
+    """
+
+    def setUp(self) -> None:
+        logging.getLogger(__script_name__).setLevel(logging.WARNING)
+
+    def test_config_compression(self) -> None:
+        """Test Config.compression() defaulting to the codec of the target."""
+        self.assertEqual(
+            compressed_config("root.tar.zst", level=19).compression(),
+            {"codec": "zstd", "level": 19, "threads": 0, "type": "tar"},
+        )
+        self.assertEqual(
+            compressed_config("root.squashfs", threads=4).compression(),
+            {"codec": "xz", "level": None, "threads": 4, "type": "squashfs"},
+        )
+        self.assertIsNone(compressed_config("root", level=9).compression())
+
+    def test_check_codec_mismatch(self) -> None:
+        """Test Config.check() rejecting a codec that does not match the target."""
+        config = compressed_config("root.tar.xz", codec="zstd")
+        with self.assertRaisesRegex(ValueError, "codec 'zstd' does not match"):
+            config.check()
+
+    def test_check_uncompressed_tarball(self) -> None:
+        """Test Config.check() rejecting compression for uncompressed tarballs."""
+        config = compressed_config("root.tar", codec="xz")
+        with self.assertRaisesRegex(ValueError, "uncompressed tarball"):
+            config.check()
+
+    def test_check_unknown_codec(self) -> None:
+        """Test Config.check() rejecting unsupported codecs."""
+        config = compressed_config("root.squashfs", codec="lzma")
+        with self.assertRaisesRegex(ValueError, "Unsupported compression codec 'lzma'"):
+            config.check()
+
+    def test_check_negative_threads(self) -> None:
+        """Test Config.check() rejecting a negative number of threads."""
+        config = compressed_config("root.tar.xz", threads=-1)
+        with self.assertRaisesRegex(ValueError, "threads needs to be a non-negative integer"):
+            config.check()
+
+    def test_compressor_xz(self) -> None:
+        """Test compressor_command() for xz."""
+        compression = {"codec": "xz", "level": 9, "threads": 8, "type": "tar"}
+        self.assertEqual(
+            compressor_command(compression, "root.tar.xz"),
+            ["xz", "--threads=8", "-9", "--stdout"],
+        )
+
+    def test_compressor_zstd_ultra(self) -> None:
+        """Test compressor_command() for zstd with levels above 19."""
+        compression = {"codec": "zstd", "level": 22, "threads": 2, "type": "tar"}
+        self.assertEqual(
+            compressor_command(compression, "root.tar.zst"),
+            ["zstd", "--quiet", "--threads=2", "--ultra", "-22", "--stdout"],
+        )
+
+    @unittest.mock.patch("os.cpu_count", unittest.mock.MagicMock(return_value=16))
+    def test_compressor_squashfs(self) -> None:
+        """Test compressor_command() for squashfs images using all CPUs."""
+        compression = {"codec": "zstd", "level": 15, "threads": 0, "type": "squashfs"}
+        self.assertEqual(
+            compressor_command(compression, "/output/root.squashfs"),
+            [
+                "tar2sqfs",
+                "--quiet",
+                "--no-skip",
+                "--force",
+                "--exportable",
+                "--compressor",
+                "zstd",
+                "--block-size",
+                "1048576",
+                "--num-jobs",
+                "16",
+                "--comp-extra",
+                "level=15",
+                "/output/root.squashfs",
+            ],
+        )
+
+    def test_construct_parameters(self) -> None:
+        """Test Mmdebstrap sending the tar stream to stdout for compression."""
+        config = compressed_config("root.tar.xz", level=9)
+        config["mmdebstrap"]["format"] = "tar"
+        parameters = Mmdebstrap(config).construct_parameters("/output")
+        self.assertEqual(parameters[1], "--format=tar")
+        self.assertEqual(parameters[-2:], ["bookworm", "-"])
+
+    def test_call_compressed(self) -> None:
+        """Test Mmdebstrap piping the output of mmdebstrap into the compressor."""
+        with tempfile.TemporaryDirectory() as output_dir:
+            target = os.path.join(output_dir, "root.tar.gz")
+            mmdebstrap = Mmdebstrap(compressed_config(target, level=1))
+            with unittest.mock.patch.object(
+                mmdebstrap, "construct_parameters", return_value=["printf", "tar stream"]
+            ):
+                mmdebstrap.call(output_dir)
+            with gzip.open(target) as tarball:
+                self.assertEqual(tarball.read(), b"tar stream")
+
+    def test_call_compressed_failure(self) -> None:
+        """Test Mmdebstrap raising an error if mmdebstrap fails."""
+        with tempfile.TemporaryDirectory() as output_dir:
+            mmdebstrap = Mmdebstrap(compressed_config(os.path.join(output_dir, "root.tar.gz")))
+            with unittest.mock.patch.object(
+                mmdebstrap, "construct_parameters", return_value=["false"]
+            ):
+                with self.assertRaises(subprocess.CalledProcessError):
+                    mmdebstrap.call(output_dir)
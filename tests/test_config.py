@@ -23,7 +23,8 @@ import typing
 import unittest
 import unittest.mock
 
-from bdebstrap import HOOKS_DIR, Config, dict_merge, parse_args
+import bdebstrap
+from bdebstrap import HOOKS_DIR, Config, dict_merge, load_yaml, parse_args
 
 EXAMPLE_CONFIG_DIR = os.path.join(os.path.dirname(__file__), "..", "examples")
 TEST_CONFIG_DIR = os.path.join(os.path.dirname(__file__), "configs")
@@ -115,34 +116,54 @@ class TestArguments(unittest.TestCase):
             {
                 "aptopt": None,
                 "architectures": None,
+                "batch": [],
+                "cache_dir": None,
+                "cgroup": False,
+                "checkpoint_dir": None,
+                "compression_benchmark": False,
+                "checksums": False,
                 "cleanup_hook": None,
                 "components": None,
                 "config": [],
+                "config_cache": None,
+                "cpu_weight": None,
                 "customize_hook": None,
                 "dpkgopt": None,
                 "env": {},
                 "essential_hook": None,
+                "export_bundle": False,
                 "extract_hook": None,
                 "force": False,
                 "format": None,
                 "hook_dir": None,
                 "hostname": None,
                 "install_recommends": False,
+                "io_weight": None,
+                "jobs": 1,
+                "keep_generations": 0,
                 "keyring": None,
                 "log_level": logging.WARNING,
+                "memory_max": None,
+                "metrics_file": None,
                 "mirrors": [],
                 "mode": None,
                 "name": None,
                 "output_base_dir": ".",
                 "output": None,
                 "packages": None,
+                "packages_exclude": None,
+                "preflight": None,
+                "replay_bundle": None,
+                "reuse_bases": False,
                 "setup_hook": None,
                 "simulate": False,
                 "skip": None,
                 "suite": None,
                 "target": None,
+                "timings": False,
                 "tmpdir": None,
                 "variant": None,
+                "verify_reproducible": False,
             },
         )
 
@@ -158,6 +179,44 @@ class TestArguments(unittest.TestCase):
             parse_args(["--env", "invalid"])
         self.assertIn("Failed to parse --env 'invalid'.", stderr.getvalue())
 
+    def test_batch(self) -> None:
+        """Test parsing --batch and --jobs parameters."""
+        args = parse_args(["-c", "common.yaml", "--batch", "a.yaml", "b.yaml", "-j", "4"])
+        self.assertEqual(
+            get_subset(args.__dict__, {"batch", "config", "jobs"}),
+            {"batch": ["a.yaml", "b.yaml"], "config": ["common.yaml"], "jobs": 4},
+        )
+
+    def test_batch_with_output(self) -> None:
+        """Test that --output cannot be combined with --batch."""
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr), self.assertRaises(SystemExit):
+            parse_args(["--batch", "a.yaml", "--output", "out"])
+        self.assertIn("--output cannot be used in batch mode", stderr.getvalue())
+
+    def test_invalid_jobs(self) -> None:
+        """Test non-positive --jobs parameter."""
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr), self.assertRaises(SystemExit):
+            parse_args(["--jobs", "0"])
+        self.assertIn("number of jobs needs to be positive", stderr.getvalue())
+
+    def test_replay_bundle(self) -> None:
+        """Test parsing --replay-bundle with a bundle directory."""
+        with tempfile.TemporaryDirectory(prefix="bdebstrap-") as bundle:
+            os.mkdir(os.path.join(bundle, "archives"))
+            os.mkdir(os.path.join(bundle, "lists"))
+            args = parse_args(["--replay-bundle", os.path.relpath(bundle)])
+            self.assertEqual(args.replay_bundle, bundle)
+
+    def test_replay_bundle_incomplete(self) -> None:
+        """Test --replay-bundle with a directory that is not a bundle."""
+        stderr = io.StringIO()
+        with tempfile.TemporaryDirectory(prefix="bdebstrap-") as bundle:
+            with contextlib.redirect_stderr(stderr), self.assertRaises(SystemExit):
+                parse_args(["--replay-bundle", bundle])
+        self.assertIn("lacks the 'archives' subdirectory", stderr.getvalue())
+
     def test_mirrors_with_spaces(self) -> None:
         """Test --mirrors with leading/trailing spaces."""
         args = parse_args(
@@ -247,10 +306,14 @@ class TestArguments(unittest.TestCase):
                 "main,non-free contrib",
                 "--architectures",
                 "amd64,i386",
+                "--packages-exclude",
+                "*-doc,netconsole",
             ]
         )
         self.assertEqual(
-            get_subset(args.__dict__, {"architectures", "components", "packages"}),
+            get_subset(
+                args.__dict__, {"architectures", "components", "packages", "packages_exclude"}
+            ),
             {
                 "architectures": ["amd64", "i386"],
                 "components": ["main", "non-free", "contrib"],
@@ -261,6 +324,7 @@ class TestArguments(unittest.TestCase):
                     "openssh-server",
                     "restricted-ssh-commands",
                 ],
+                "packages_exclude": ["*-doc", "netconsole"],
             },
         )
 
@@ -434,6 +498,68 @@ class TestConfig(unittest.TestCase):
             ],
         )
 
+    def test_derive(self) -> None:
+        """Test deriving a configuration from the configuration of its base image."""
+        base = Config()
+        base.load(os.path.join(TEST_CONFIG_DIR, "base.yaml"))
+        config = Config()
+        config.load(os.path.join(TEST_CONFIG_DIR, "derived.yaml"))
+        self.assertEqual(
+            config["base"], os.path.join(os.path.abspath(TEST_CONFIG_DIR), "base.yaml")
+        )
+        config.derive(base)
+        self.assertEqual(
+            config["mmdebstrap"],
+            {
+                "architectures": ["amd64"],
+                "customize-hooks": [
+                    'chroot "$1" update-alternatives --set editor /usr/bin/vim.basic'
+                ],
+                "keyrings": ["/usr/share/keyrings/debian-archive-keyring.gpg"],
+                "mode": "unshare",
+                "packages": ["vim"],
+                "suite": "bookworm",
+                "target": "root.tar.xz",
+                "variant": "minbase",
+            },
+        )
+
+    def test_derive_local_deb(self) -> None:
+        """Test deriving a configuration that installs a local .deb package."""
+        config = Config(mmdebstrap={"packages": ["./bdebstrap_0.7.0_all.deb"]})
+        with self.assertRaisesRegex(ValueError, "cannot be installed on top of a base image"):
+            config.derive(Config())
+
+    def test_wrong_base_type(self) -> None:
+        """Test error message for a base that is not a string."""
+        config = Config()
+        config["base"] = ["base.yaml"]
+        config["name"] = "derived"
+        with self.assertRaisesRegex(ValueError, "Unexpected type 'list' for 'base'"):
+            config.check()
+
+    def test_environment(self) -> None:
+        """Test environment for calling mmdebstrap does not modify os.environ."""
+        config = Config(env={"SOURCE_DATE_EPOCH": 1581694618})
+        config["name"] = "Debian-unstable"
+        with unittest.mock.patch.dict(
+            "os.environ", {"LD_PRELOAD": "libgtk3-nocsd.so.0", "PATH": "/usr/bin"}, clear=True
+        ):
+            env = config.environment("/dev/shm")
+            self.assertEqual(os.environ["LD_PRELOAD"], "libgtk3-nocsd.so.0")
+            self.assertNotIn("TMPDIR", os.environ)
+        self.assertEqual(
+            env,
+            {
+                "BDEBSTRAP_HOOKS": str(HOOKS_DIR),
+                "BDEBSTRAP_NAME": "Debian-unstable",
+                "BDEBSTRAP_OUTPUT_DIR": "/tmp/bdebstrap-output",
+                "PATH": "/usr/bin",
+                "SOURCE_DATE_EPOCH": "1581694618",
+                "TMPDIR": "/dev/shm",
+            },
+        )
+
     def test_loading(self) -> None:
         """Test loading a YAML configuration file."""
         config = Config()
@@ -520,7 +646,7 @@ class TestConfig(unittest.TestCase):
         """Test error message for wrong list element type."""
         config = Config()
         config.load(os.path.join(TEST_CONFIG_DIR, "wrong-element-type.yaml"))
-        with self.assertRaisesRegex(ValueError, "'customize-hooks' has type 'CommentedMap'"):
+        with self.assertRaisesRegex(ValueError, "'customize-hooks' has type 'dict'"):
             config.check()
 
 
@@ -538,3 +664,122 @@ class TestDictMerge(unittest.TestCase):
         items = {"A": {"A1": 0, "A4": 4}, "C": 4}
         dict_merge(items, {"A": {"A1": 1, "A5": 5}})
         self.assertEqual(items, {"A": {"A1": 1, "A4": 4, "A5": 5}, "C": 4})
+
+
+class TestLoadYaml(unittest.TestCase):
+    """
+    This unittest class tests the cache of parsed YAML files.
+    """
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmpdir.cleanup)
+        self.config_filename = os.path.join(self.tmpdir.name, "config.yaml")
+        with open(self.config_filename, "w", encoding="utf-8") as config_file:
+            config_file.write("---\nmmdebstrap:\n  packages:\n    - vim\n")
+        patcher = unittest.mock.patch.dict("bdebstrap._PARSED_YAML", clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_copy(self) -> None:
+        """Test that modifying the loaded data does not modify the cached data."""
+        load_yaml(self.config_filename)["mmdebstrap"]["packages"].append("less")
+        self.assertEqual(load_yaml(self.config_filename), {"mmdebstrap": {"packages": ["vim"]}})
+
+    def test_disk_cache(self) -> None:
+        """Test reusing the on-disk cache in another invocation."""
+        cache_dir = os.path.join(self.tmpdir.name, "cache")
+        load_yaml(self.config_filename, cache_dir)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        bdebstrap._PARSED_YAML.clear()  # pylint: disable=protected-access
+        with unittest.mock.patch("bdebstrap.yaml_loader") as yaml_loader_mock:
+            data = load_yaml(self.config_filename, cache_dir)
+        yaml_loader_mock.assert_not_called()
+        self.assertEqual(data, {"mmdebstrap": {"packages": ["vim"]}})
+
+    def test_disk_cache_key_types(self) -> None:
+        """Test that a warm load returns the same data as a cold load (non-string keys)."""
+        with open(self.config_filename, "w", encoding="utf-8") as config_file:
+            config_file.write("---\n1: one\nfalse: no\nnested:\n  2.5: [half]\n")
+        cache_dir = os.path.join(self.tmpdir.name, "cache")
+        cold = load_yaml(self.config_filename, cache_dir)
+        self.assertEqual(cold, {1: "one", False: "no", "nested": {2.5: ["half"]}})
+        bdebstrap._PARSED_YAML.clear()  # pylint: disable=protected-access
+        self.assertEqual(load_yaml(self.config_filename, cache_dir), cold)
+        self.assertFalse(os.path.exists(cache_dir))
+
+    def test_modified(self) -> None:
+        """Test that modifying the file invalidates the cache."""
+        cache_dir = os.path.join(self.tmpdir.name, "cache")
+        load_yaml(self.config_filename, cache_dir)
+        with open(self.config_filename, "a", encoding="utf-8") as config_file:
+            config_file.write("    - less\n")
+        self.assertEqual(
+            load_yaml(self.config_filename, cache_dir),
+            {"mmdebstrap": {"packages": ["vim", "less"]}},
+        )
+
+
+class TestPackageSets(unittest.TestCase):
+    """
+    This unittest class tests excluding packages and package groups.
+    """
+
+    def test_sanitize_packages_exclude(self) -> None:
+        """Test sanitize_packages method: exclude packages."""
+        config = Config()
+        config["mmdebstrap"] = {
+            "packages": [
+                "?priority(important)",
+                "./debs/ionit_0.5_all.deb",
+                "libc6:i386",
+                "libc6",
+                "nano/bookworm-backports",
+                "vim-doc",
+                "vim",
+                "zlib1g:i386",
+            ],
+            "packages-exclude": ["?priority(important)", "*-doc", "*:i386", "ionit", "nano"],
+        }
+        config.sanitize_packages()
+        self.assertEqual(config["mmdebstrap"]["packages"], ["libc6", "vim"])
+
+    def test_sanitize_packages_exclude_architecture(self) -> None:
+        """Test sanitize_packages method: exclude packages for all or one architecture."""
+        config = Config()
+        config["mmdebstrap"] = {
+            "packages": ["libc6:amd64", "libc6:i386", "zlib1g:amd64", "zlib1g:i386"],
+            "packages-exclude": ["libc6", "zlib1g:i386"],
+        }
+        config.sanitize_packages()
+        self.assertEqual(config["mmdebstrap"]["packages"], ["zlib1g:amd64"])
+
+    def test_sanitize_packages_groups(self) -> None:
+        """Test sanitize_packages method: union and difference of package groups."""
+        config = Config()
+        config["package-groups"] = {
+            "base": ["less", "vim"],
+            "desktop": ["@base", "firefox-esr", "xfce4"],
+            "minimal": ["less"],
+        }
+        config["mmdebstrap"] = {
+            "packages": ["@desktop", "ssh"],
+            "packages-exclude": ["@minimal"],
+        }
+        config.sanitize_packages()
+        self.assertEqual(config["mmdebstrap"]["packages"], ["vim", "firefox-esr", "xfce4", "ssh"])
+
+    def test_sanitize_packages_group_cycle(self) -> None:
+        """Test sanitize_packages method: package groups referencing each other."""
+        config = Config()
+        config["package-groups"] = {"a": ["@b"], "b": ["@a"]}
+        config["mmdebstrap"] = {"packages": ["@a"]}
+        with self.assertRaisesRegex(ValueError, "package groups form a cycle: a -> b -> a"):
+            config.sanitize_packages()
+
+    def test_sanitize_packages_unknown_group(self) -> None:
+        """Test sanitize_packages method: reference to an unknown package group."""
+        config = Config()
+        config["mmdebstrap"] = {"packages": ["@desktop"]}
+        with self.assertRaisesRegex(ValueError, "Unknown package group 'desktop'"):
+            config.sanitize_packages()
@@ -0,0 +1,149 @@
+# Copyright (C) 2026 Benjamin Drung <bdrung@posteo.de>
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""Test the diff subcommand of bdebstrap."""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from bdebstrap import diff_outputs, main, version_compare
+
+
+def write_output(output_dir: str, manifest: str, config: str | None = None) -> str:
+    """Create an output directory with the given manifest and config.yaml."""
+    os.makedirs(output_dir)
+    with open(os.path.join(output_dir, "manifest"), "w", encoding="utf-8") as manifest_file:
+        manifest_file.write(manifest)
+    if config is not None:
+        with open(os.path.join(output_dir, "config.yaml"), "w", encoding="utf-8") as config_file:
+            config_file.write(config)
+    return output_dir
+
+
+class TestVersionCompare(unittest.TestCase):
+    """
+    This unittest class tests the Debian version comparison.
+    """
+
+    def test_equal(self) -> None:
+        """Test comparing equal versions."""
+        self.assertEqual(version_compare("1.2.3-1", "1.2.3-1"), 0)
+        self.assertEqual(version_compare("0:1.0", "1.0"), 0)
+
+    def test_lower(self) -> None:
+        """Test comparing lower with higher versions."""
+        for lower, higher in (
+            ("1.9", "1.10"),
+            ("1.0~rc1", "1.0"),
+            ("1.0", "1.0-1"),
+            ("1.0-1", "1.0-1+b1"),
+            ("1.0a", "1.0+"),
+            ("1:9.9", "2:0.1"),
+            ("2.36-8", "2.36-9"),
+            ("1.0-1~bpo12+1", "1.0-1"),
+        ):
+            self.assertLess(version_compare(lower, higher), 0, f"{lower} < {higher}")
+            self.assertGreater(version_compare(higher, lower), 0, f"{higher} > {lower}")
+
+
+class TestDiff(unittest.TestCase):
+    """
+    This unittest class tests comparing builds.
+    """
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_diff_outputs(self) -> None:
+        """Test comparing two output directories."""
+        old = write_output(
+            os.path.join(self.tmpdir.name, "old"),
+            "base-files\t13.1\nlibc6\t2.36-9\nnano\t7.2-1\nvim\t2:9.0-1\n",
+            "---\nenv:\n  SOURCE_DATE_EPOCH: 1700000000\nname: example\n",
+        )
+        new = write_output(
+            os.path.join(self.tmpdir.name, "new"),
+            "base-files\t13.1\nlibc6\t2.36-8\nvim\t2:9.1-1\nzsh\t5.9-4\n",
+            "---\nenv:\n  SOURCE_DATE_EPOCH: 1700001234\nname: example\n",
+        )
+        self.assertEqual(
+            diff_outputs(old, new),
+            {
+                "status": "changed",
+                "added": [{"package": "zsh", "version": "5.9-4"}],
+                "removed": [{"package": "nano", "version": "7.2-1"}],
+                "upgraded": [{"package": "vim", "old": "2:9.0-1", "new": "2:9.1-1"}],
+                "downgraded": [{"package": "libc6", "old": "2.36-9", "new": "2.36-8"}],
+                "config": [],
+            },
+        )
+
+    def test_diff_config(self) -> None:
+        """Test comparing two output directories with different config.yaml."""
+        old = write_output(os.path.join(self.tmpdir.name, "old"), "vim\t2:9.0-1\n", "name: old\n")
+        new = write_output(os.path.join(self.tmpdir.name, "new"), "vim\t2:9.0-1\n", "name: new\n")
+        diff = diff_outputs(old, new)
+        self.assertEqual(diff["status"], "changed")
+        self.assertEqual(
+            diff["config"][2:], ["@@ -1,2 +1,2 @@\n", " ---\n", "-name: old\n", "+name: new\n"]
+        )
+
+    def test_main_unchanged(self) -> None:
+        """Test diff subcommand for two equal manifest files."""
+        output = write_output(os.path.join(self.tmpdir.name, "out"), "vim\t2:9.0-1\n")
+        manifest = os.path.join(output, "manifest")
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.assertEqual(main(["diff", manifest, manifest]), 0)
+        self.assertEqual(stdout.getvalue(), "")
+
+    def test_main_base_dirs(self) -> None:
+        """Test diff subcommand comparing output base directories as JSON."""
+        old = os.path.join(self.tmpdir.name, "old")
+        new = os.path.join(self.tmpdir.name, "new")
+        write_output(os.path.join(old, "same"), "vim\t2:9.0-1\n")
+        write_output(os.path.join(new, "same"), "vim\t2:9.0-1\n")
+        write_output(os.path.join(old, "gone"), "vim\t2:9.0-1\n")
+        write_output(os.path.join(new, "upgrade"), "vim\t2:9.1-1\n")
+        write_output(os.path.join(old, "upgrade"), "vim\t2:9.0-1\n")
+        write_output(os.path.join(new, "fresh"), "zsh\t5.9-4\n")
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.assertEqual(main(["diff", "--json", "-j", "2", old, new]), 1)
+        diffs = json.loads(stdout.getvalue())
+        self.assertEqual(
+            {name: diff["status"] for name, diff in diffs.items()},
+            {"fresh": "added", "gone": "removed", "same": "unchanged", "upgrade": "changed"},
+        )
+        self.assertEqual(diffs["fresh"]["added"], [{"package": "zsh", "version": "5.9-4"}])
+        self.assertEqual(
+            diffs["upgrade"]["upgraded"], [{"package": "vim", "old": "2:9.0-1", "new": "2:9.1-1"}]
+        )
+
+    def test_main_text(self) -> None:
+        """Test diff subcommand printing the differences."""
+        old = write_output(os.path.join(self.tmpdir.name, "old"), "nano\t7.2-1\nvim\t2:9.0-1\n")
+        new = write_output(os.path.join(self.tmpdir.name, "new"), "vim\t2:9.1-1\n")
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            self.assertEqual(main(["diff", old, new]), 1)
+        self.assertEqual(
+            stdout.getvalue(),
+            "removed    nano 7.2-1\nupgraded   vim 2:9.0-1 -> 2:9.1-1\n",
+        )
@@ -14,13 +14,21 @@
 
 """Test helper functions of bdebstrap."""
 
+import errno
 import os
 import tempfile
 import unittest
 import unittest.mock
 from unittest.mock import MagicMock
 
-from bdebstrap import clamp_mtime, duration_str, escape_cmd, prepare_output_dir
+from bdebstrap import (
+    clamp_mtime,
+    duration_str,
+    escape_cmd,
+    prepare_output_dir,
+    publish_or_discard,
+    publish_output,
+)
 
 
 class TestClampMtime(unittest.TestCase):
@@ -127,15 +135,19 @@ class TestPrepareOutputDir(unittest.TestCase):
             self.assertFalse(os.path.isdir(output_dir))
 
     def test_force(self) -> None:
-        """Test replacing an existing output directory."""
+        """Test building next to an existing output directory."""
         with tempfile.TemporaryDirectory(prefix=self.TMP_PREFIX) as tmpdir:
             output_dir = os.path.join(tmpdir, "unstable")
             os.makedirs(output_dir)
             os.mknod(os.path.join(output_dir, "root.tar"))
 
-            self.assertTrue(prepare_output_dir(output_dir, True))
-            self.assertTrue(os.path.isdir(output_dir))
-            self.assertEqual(os.listdir(output_dir), [])
+            staging_dir = prepare_output_dir(output_dir, True)
+            assert staging_dir is not None
+            self.assertEqual(os.path.dirname(staging_dir), tmpdir)
+            self.assertTrue(os.path.basename(staging_dir).startswith(".unstable.staging."))
+            self.assertEqual(os.listdir(staging_dir), [])
+            # The existing output directory is left untouched until the build succeeded.
+            self.assertEqual(os.listdir(output_dir), ["root.tar"])
 
     def test_existing(self) -> None:
         """Test failure when output directory already exists."""
@@ -151,8 +163,89 @@ class TestPrepareOutputDir(unittest.TestCase):
             self.assertEqual(os.listdir(output_dir), ["root.tar"])
 
     def test_missing_output_dir(self) -> None:
-        """Test creating the missing output directory."""
+        """Test creating the missing parent and staging directory."""
         with tempfile.TemporaryDirectory(prefix=self.TMP_PREFIX) as tmpdir:
-            output_dir = os.path.join(tmpdir, "unstable")
-            self.assertTrue(prepare_output_dir(output_dir, False))
-            self.assertTrue(os.path.isdir(output_dir))
+            output_dir = os.path.join(tmpdir, "images", "unstable")
+            staging_dir = prepare_output_dir(output_dir, False)
+            assert staging_dir is not None
+            self.assertTrue(os.path.isdir(staging_dir))
+            self.assertFalse(os.path.exists(output_dir))
+            self.assertEqual(os.stat(staging_dir).st_mode & 0o777, 0o777 & ~get_umask())
+
+
+def get_umask() -> int:
+    """Return the current umask."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+class TestPublishOutput(unittest.TestCase):
+    """
+    This unittest class tests the publish_output function.
+    """
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _build(self, content: str) -> str:
+        staging_dir = tempfile.mkdtemp(dir=self.tmpdir.name)
+        with open(os.path.join(staging_dir, "manifest"), "w", encoding="utf-8") as manifest:
+            manifest.write(content)
+        return staging_dir
+
+    @unittest.mock.patch("bdebstrap.remove_in_background")
+    def test_publish_new(self, remove_mock: MagicMock) -> None:
+        """Test publishing the first build."""
+        output_dir = os.path.join(self.tmpdir.name, "unstable")
+        publish_output(self._build("first"), output_dir)
+        self.assertEqual(os.listdir(output_dir), ["manifest"])
+        self.assertEqual(os.listdir(self.tmpdir.name), ["unstable"])
+        remove_mock.assert_called_once_with([])
+
+    @unittest.mock.patch("bdebstrap.remove_in_background")
+    def test_publish_keep_generations(self, remove_mock: MagicMock) -> None:
+        """Test replacing the output directory and keeping one previous generation."""
+        output_dir = os.path.join(self.tmpdir.name, "unstable")
+        for content in ("first", "second", "third"):
+            publish_output(self._build(content), output_dir, keep_generations=1)
+        with open(os.path.join(output_dir, "manifest"), encoding="utf-8") as manifest:
+            self.assertEqual(manifest.read(), "third")
+        generations = sorted(os.listdir(self.tmpdir.name))
+        self.assertEqual(len(generations), 3)
+        self.assertEqual(generations[2], "unstable")
+        # The first generation is obsolete after the third build.
+        self.assertEqual(
+            remove_mock.call_args_list[-1],
+            unittest.mock.call([os.path.join(self.tmpdir.name, generations[0])]),
+        )
+
+    @unittest.mock.patch("bdebstrap.remove_in_background")
+    def test_publish_failure(self, remove_mock: MagicMock) -> None:
+        """Test keeping the previous output directory if the staging directory cannot be moved."""
+        output_dir = os.path.join(self.tmpdir.name, "unstable")
+        publish_output(self._build("first"), output_dir)
+        staging_dir = self._build("second")
+        rename = os.rename
+
+        def fail_on_staging(source: str, destination: str) -> None:
+            if source == staging_dir:
+                raise OSError(errno.EXDEV, "Invalid cross-device link")
+            rename(source, destination)
+
+        with unittest.mock.patch("os.rename", side_effect=fail_on_staging):
+            with self.assertLogs("bdebstrap", level="ERROR") as context_manager:
+                self.assertFalse(publish_or_discard(staging_dir, output_dir))
+        self.assertIn("Failed to replace the output directory", context_manager.output[0])
+        with open(os.path.join(output_dir, "manifest"), encoding="utf-8") as manifest:
+            self.assertEqual(manifest.read(), "first")
+        remove_mock.assert_called_with([staging_dir])
+
+    @unittest.mock.patch("bdebstrap.remove_in_background")
+    def test_publish_in_place(self, remove_mock: MagicMock) -> None:
+        """Test that publishing does nothing if the build was done in place."""
+        output_dir = self._build("in place")
+        publish_output(output_dir, output_dir)
+        self.assertEqual(os.listdir(output_dir), ["manifest"])
+        remove_mock.assert_not_called()
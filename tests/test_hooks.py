@@ -0,0 +1,101 @@
+# Copyright (C) 2026 Benjamin Drung <bdrung@posteo.de>
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""Test the hook scripts shipped with bdebstrap."""
+
+import os
+import subprocess
+import tempfile
+import unittest
+
+from . import get_path
+
+
+class TestHooks(unittest.TestCase):
+    """
+    This unittest class tests the enable-units and disable-units hooks
+    (with a fake chroot command that logs its calls).
+    """
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmpdir.cleanup)
+        self.root = os.path.join(self.tmpdir.name, "root")
+        self.log = os.path.join(self.tmpdir.name, "chroot.log")
+        bin_dir = os.path.join(self.tmpdir.name, "bin")
+        os.mkdir(bin_dir)
+        with open(os.path.join(bin_dir, "chroot"), "w", encoding="utf-8") as chroot:
+            chroot.write(f'#!/bin/sh\necho "$*" >> "{self.log}"\n')
+        os.chmod(os.path.join(bin_dir, "chroot"), 0o755)
+        self.env = dict(os.environ, PATH=f"{bin_dir}:{os.environ['PATH']}")
+        for directory in ("etc/init.d", "lib/systemd/system", "etc/systemd/system"):
+            os.makedirs(os.path.join(self.root, directory))
+        for path in ("lib/systemd/system/ssh.service", "etc/init.d/cron", "etc/init.d/old"):
+            with open(os.path.join(self.root, path), "w", encoding="utf-8"):
+                pass
+
+    def _wants(self, target: str, unit: str) -> str:
+        """Create the wants symlink of the given unit and return its path."""
+        wants = os.path.join(self.root, "etc/systemd/system", f"{target}.wants")
+        os.makedirs(wants, exist_ok=True)
+        os.symlink(f"/lib/systemd/system/{unit}", os.path.join(wants, unit))
+        return os.path.join(wants, unit)
+
+    def _call(self, hook: str, units: list[str]) -> list[str]:
+        """Call the given hook and return the commands called in the chroot."""
+        subprocess.run(
+            [get_path(f"hooks/{hook}"), self.root] + units,
+            check=True,
+            env=self.env,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            with open(self.log, encoding="utf-8") as log:
+                return log.read().splitlines()
+        except FileNotFoundError:
+            return []
+
+    def test_enable_units(self) -> None:
+        """Test enabling all found units with one systemctl call."""
+        self.assertEqual(
+            self._call("enable-units", ["ssh", "missing", "cron"]),
+            [f"{self.root} /bin/systemctl enable ssh cron"],
+        )
+
+    def test_enable_units_none_found(self) -> None:
+        """Test enable-units not calling systemctl if no unit is found."""
+        self.assertEqual(self._call("enable-units", ["missing"]), [])
+
+    def test_disable_units(self) -> None:
+        """Test disabling systemd units and SysV services."""
+        ssh = self._wants("multi-user.target", "ssh.service")
+        ssh_socket = self._wants("sockets.target", "ssh.socket")
+        timer = self._wants("timers.target", "apt-daily.timer")
+        self.assertEqual(
+            self._call("disable-units", ["ssh", "apt-*", "old", "missing"]),
+            [f"{self.root} /usr/sbin/update-rc.d old disable"],
+        )
+        self.assertFalse(os.path.lexists(ssh))
+        self.assertFalse(os.path.lexists(timer))
+        self.assertTrue(os.path.lexists(ssh_socket))
+
+    def test_disable_units_overlapping(self) -> None:
+        """Test disable-units with multiple arguments matching the same unit."""
+        ssh = self._wants("multi-user.target", "ssh.service")
+        timer = self._wants("timers.target", "apt-daily.timer")
+        self.assertEqual(
+            self._call("disable-units", ["ssh", "ssh.service", "apt-*", "apt-daily.timer"]), []
+        )
+        self.assertFalse(os.path.lexists(ssh))
+        self.assertFalse(os.path.lexists(timer))
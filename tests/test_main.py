@@ -14,34 +14,56 @@
 
 """Test main function of bdebstrap."""
 
+import contextlib
+import io
 import os
 import subprocess
+import tempfile
+import typing
 import unittest
 import unittest.mock
 
-from bdebstrap import OUTPUT_DIR, main
+from bdebstrap import OUTPUT_DIR, Config, load_config, main, parse_args
 
 EXAMPLE_CONFIG_DIR = os.path.join(os.path.dirname(__file__), "..", "examples")
+TEST_CONFIG_DIR = os.path.join(os.path.dirname(__file__), "configs")
 
 
 def default_hooks(output_dir: str) -> list[str]:
     """Return the list of default hooks."""
     return [
         f'--essential-hook=mkdir -p "$1{OUTPUT_DIR}"',
-        "--customize-hook=chroot \"$1\" dpkg-query -f='${Package}\\t${Version}\\n' -W "
-        f'> "$1{OUTPUT_DIR}/manifest"',
+        f'--customize-hook=cp "$1/var/lib/dpkg/status" "$1{OUTPUT_DIR}/.dpkg-status"',
         f'--customize-hook=sync-out "{OUTPUT_DIR}" "{output_dir}"',
         f'--customize-hook=rm -rf "$1{OUTPUT_DIR}"',
     ]
 
 
+def build_in_place(output_dir: str, *_: bool) -> str:
+    """Mock prepare_output_dir to build directly in the output directory."""
+    return output_dir
+
+
+def create_base(output_dir: str, suite: str = "bookworm") -> None:
+    """Create an existing base image (with its config.yaml) in the given directory."""
+    os.mkdir(output_dir)
+    with open(os.path.join(output_dir, "root.tar"), "wb"):
+        pass
+    config = load_config(parse_args(["-c", os.path.join(TEST_CONFIG_DIR, "base.yaml")]))
+    assert config is not None
+    config["mmdebstrap"]["suite"] = suite
+    config.set_source_date_epoch()
+    with open(os.path.join(output_dir, "config.yaml"), "w", encoding="utf-8") as config_file:
+        config_file.write(config.dumps())
+
+
 class TestMain(unittest.TestCase):
     """
     This unittest class tests the main function.
     """
 
     @unittest.mock.patch("bdebstrap.Config.save")
-    @unittest.mock.patch("bdebstrap.prepare_output_dir")
+    @unittest.mock.patch("bdebstrap.prepare_output_dir", side_effect=build_in_place)
     @unittest.mock.patch("bdebstrap.Mmdebstrap.call")
     def test_debian_example(
         self,
@@ -60,11 +82,11 @@ class TestMain(unittest.TestCase):
             self.assertEqual(main(args), 0)
             self.assertIn("Execution time", context_manager.output[-1])
         config_save_mock.assert_called_once_with("./Debian-unstable/config.yaml", False)
-        mmdebstrap_call_mock.assert_called_once_with("./Debian-unstable", False)
+        mmdebstrap_call_mock.assert_called_once_with("./Debian-unstable", False, unittest.mock.ANY)
         prepare_output_dir_mock.assert_called_once_with("./Debian-unstable", False, False)
 
     @unittest.mock.patch("bdebstrap.Config.save")
-    @unittest.mock.patch("bdebstrap.prepare_output_dir")
+    @unittest.mock.patch("bdebstrap.prepare_output_dir", side_effect=build_in_place)
     @unittest.mock.patch("bdebstrap.Mmdebstrap.call")
     def test_failed_mmdebstrap(
         self,
@@ -82,11 +104,11 @@ class TestMain(unittest.TestCase):
                 context_manager.output,
             )
         config_save_mock.assert_called_once_with("./foobar/config.yaml", False)
-        mmdebstrap_call_mock.assert_called_once_with("./foobar", False)
+        mmdebstrap_call_mock.assert_called_once_with("./foobar", False, unittest.mock.ANY)
         prepare_output_dir_mock.assert_called_once_with("./foobar", False, False)
 
     @unittest.mock.patch("bdebstrap.Config.save")
-    @unittest.mock.patch("bdebstrap.prepare_output_dir")
+    @unittest.mock.patch("bdebstrap.prepare_output_dir", side_effect=build_in_place)
     @unittest.mock.patch("bdebstrap.Mmdebstrap.call")
     def test_empty_target(
         self,
@@ -98,11 +120,11 @@ class TestMain(unittest.TestCase):
         with self.assertLogs("bdebstrap", level="INFO"):
             self.assertEqual(main(["--name", "empty-target", "unstable"]), 0)
         config_save_mock.assert_called_once_with("./empty-target/config.yaml", False)
-        mmdebstrap_call_mock.assert_called_once_with("./empty-target", False)
+        mmdebstrap_call_mock.assert_called_once_with("./empty-target", False, unittest.mock.ANY)
         prepare_output_dir_mock.assert_called_once_with("./empty-target", False, False)
 
     @unittest.mock.patch("bdebstrap.Config.save")
-    @unittest.mock.patch("bdebstrap.prepare_output_dir")
+    @unittest.mock.patch("bdebstrap.prepare_output_dir", side_effect=build_in_place)
     @unittest.mock.patch("subprocess.check_call")
     def test_minus_target(
         self,
@@ -114,7 +136,291 @@ class TestMain(unittest.TestCase):
         with self.assertLogs("bdebstrap", level="INFO"):
             self.assertEqual(main(["--target=-", "--name", "minus-target", "unstable"]), 0)
         check_call_mock.assert_called_once_with(
-            ["mmdebstrap", "-v"] + default_hooks("./minus-target") + ["unstable", "-"]
+            ["mmdebstrap", "-v"] + default_hooks("./minus-target") + ["unstable", "-"],
+            env=unittest.mock.ANY,
         )
         config_save_mock.assert_called_once_with("./minus-target/config.yaml", False)
         prepare_output_dir_mock.assert_called_once_with("./minus-target", False, False)
+
+    @unittest.mock.patch("bdebstrap.Config.save")
+    @unittest.mock.patch("bdebstrap.prepare_output_dir", side_effect=build_in_place)
+    @unittest.mock.patch("bdebstrap.Mmdebstrap.call")
+    def test_batch(
+        self,
+        mmdebstrap_call_mock: unittest.mock.MagicMock,
+        prepare_output_dir_mock: unittest.mock.MagicMock,
+        config_save_mock: unittest.mock.MagicMock,
+    ) -> None:
+        """Test building multiple images in batch mode where one build fails."""
+        mmdebstrap_call_mock.side_effect = [None, subprocess.CalledProcessError(1, "mmdebstrap")]
+        args = [
+            "--output-base-dir",
+            "/srv",
+            "--batch",
+            os.path.join(EXAMPLE_CONFIG_DIR, "Debian-unstable.yaml"),
+            os.path.join(os.path.dirname(__file__), "configs", "commented-packages.yaml"),
+        ]
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr), self.assertLogs("bdebstrap", level="ERROR"):
+            self.assertEqual(main(args), 1)
+        summary = stderr.getvalue().splitlines()
+        self.assertEqual(len(summary), 3)
+        self.assertRegex(summary[0], "^IMAGE +RESULT +DURATION$")
+        self.assertRegex(summary[1], "Debian-unstable.yaml +success +[0-9.]+ seconds$")
+        self.assertRegex(summary[2], "commented-packages.yaml +FAILED +[0-9.]+ seconds$")
+        self.assertEqual(config_save_mock.call_count, 2)
+        self.assertEqual(
+            prepare_output_dir_mock.call_args_list,
+            [
+                unittest.mock.call("/srv/Debian-unstable", False, False),
+                unittest.mock.call("/srv/commented-packages", False, False),
+            ],
+        )
+
+    @unittest.mock.patch("bdebstrap.Config.save")
+    @unittest.mock.patch("bdebstrap.prepare_output_dir", side_effect=build_in_place)
+    @unittest.mock.patch("bdebstrap.Mmdebstrap.call")
+    def test_batch_stdout_target(
+        self,
+        mmdebstrap_call_mock: unittest.mock.MagicMock,
+        prepare_output_dir_mock: unittest.mock.MagicMock,
+        config_save_mock: unittest.mock.MagicMock,
+    ) -> None:
+        """Test rejecting targets written to standard output in batch mode."""
+        with tempfile.TemporaryDirectory(prefix="bdebstrap-") as tmpdir:
+            stdout = os.path.join(tmpdir, "stdout.yaml")
+            with open(stdout, "w", encoding="utf-8") as config:
+                config.write('mmdebstrap:\n  suite: unstable\n  target: "-"\n')
+            tee = os.path.join(tmpdir, "tee.yaml")
+            with open(tee, "w", encoding="utf-8") as config:
+                config.write(
+                    'mmdebstrap:\n  suite: unstable\n  target: "-"\n'
+                    "tee:\n  file: root.tar\n  stdout: false\n"
+                )
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr), self.assertLogs(
+                "bdebstrap", level="ERROR"
+            ) as context_manager:
+                self.assertEqual(main(["-b", tmpdir, "--batch", stdout, tee]), 1)
+        self.assertIn(
+            f"ERROR:bdebstrap:{stdout}: The target '-' (standard output) cannot be used "
+            "in batch mode.",
+            context_manager.output,
+        )
+        summary = stderr.getvalue().splitlines()
+        self.assertRegex(summary[1], "stdout.yaml +FAILED +")
+        self.assertRegex(summary[2], "tee.yaml +success +")
+        prepare_output_dir_mock.assert_called_once_with(f"{tmpdir}/tee", False, False)
+        mmdebstrap_call_mock.assert_called_once()
+        config_save_mock.assert_called_once()
+
+    @unittest.mock.patch("bdebstrap.Config.save")
+    @unittest.mock.patch("bdebstrap.prepare_output_dir", side_effect=build_in_place)
+    @unittest.mock.patch("bdebstrap.Mmdebstrap.call")
+    def test_batch_duplicate_names(
+        self,
+        mmdebstrap_call_mock: unittest.mock.MagicMock,
+        prepare_output_dir_mock: unittest.mock.MagicMock,
+        config_save_mock: unittest.mock.MagicMock,
+    ) -> None:
+        """Test rejecting configurations with the same name in batch mode."""
+        with tempfile.TemporaryDirectory(prefix="bdebstrap-") as tmpdir:
+            configs = []
+            for filename, name in (("a.yaml", "example"), ("b.yaml", "example"), ("c.yaml", "c")):
+                configs.append(os.path.join(tmpdir, filename))
+                with open(configs[-1], "w", encoding="utf-8") as config:
+                    config.write(f"name: {name}\nmmdebstrap:\n  suite: unstable\n")
+            with contextlib.redirect_stderr(io.StringIO()), self.assertLogs(
+                "bdebstrap", level="ERROR"
+            ) as context_manager:
+                self.assertEqual(
+                    main(["-b", tmpdir, "--target", "root.tar", "--batch"] + configs), 1
+                )
+        self.assertEqual(
+            context_manager.output[:2],
+            [
+                f"ERROR:bdebstrap:{config}: The name 'example' is used by multiple "
+                "configurations of the batch."
+                for config in configs[:2]
+            ],
+        )
+        prepare_output_dir_mock.assert_called_once_with(f"{tmpdir}/c", False, False)
+        mmdebstrap_call_mock.assert_called_once()
+        config_save_mock.assert_called_once()
+
+    @unittest.mock.patch("bdebstrap.Config.save")
+    @unittest.mock.patch("bdebstrap.prepare_output_dir", side_effect=build_in_place)
+    @unittest.mock.patch("bdebstrap.Mmdebstrap.call")
+    def test_batch_parallel(
+        self,
+        mmdebstrap_call_mock: unittest.mock.MagicMock,
+        prepare_output_dir_mock: unittest.mock.MagicMock,
+        config_save_mock: unittest.mock.MagicMock,
+    ) -> None:
+        """Test building multiple images in parallel in batch mode."""
+        args = [
+            "--jobs=2",
+            "--batch",
+            os.path.join(EXAMPLE_CONFIG_DIR, "Debian-unstable.yaml"),
+            os.path.join(EXAMPLE_CONFIG_DIR, "Ubuntu-20.04.yaml"),
+        ]
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr), self.assertLogs("bdebstrap", level="INFO"):
+            self.assertEqual(main(args), 0)
+        summary = stderr.getvalue().splitlines()
+        self.assertRegex(summary[1], "Debian-unstable.yaml +success +[0-9.]+ seconds$")
+        self.assertRegex(summary[2], "Ubuntu-20.04.yaml +success +[0-9.]+ seconds$")
+        # The builds run in worker processes.
+        mmdebstrap_call_mock.assert_not_called()
+        prepare_output_dir_mock.assert_not_called()
+        config_save_mock.assert_not_called()
+
+    @unittest.mock.patch("bdebstrap.Config.save")
+    @unittest.mock.patch("bdebstrap.prepare_output_dir", side_effect=build_in_place)
+    @unittest.mock.patch("bdebstrap.Mmdebstrap.call")
+    @unittest.mock.patch("bdebstrap.BuildCache.restore", return_value=True)
+    @unittest.mock.patch("bdebstrap.BuildCache.fingerprint", return_value="0123abcd")
+    def test_build_cache_hit(
+        self,
+        fingerprint_mock: unittest.mock.MagicMock,
+        restore_mock: unittest.mock.MagicMock,
+        mmdebstrap_call_mock: unittest.mock.MagicMock,
+        prepare_output_dir_mock: unittest.mock.MagicMock,
+        config_save_mock: unittest.mock.MagicMock,
+    ) -> None:
+        """Test reusing a cached build instead of calling mmdebstrap."""
+        args = [
+            "-c",
+            os.path.join(EXAMPLE_CONFIG_DIR, "Debian-unstable.yaml"),
+            "--name=cached",
+            "--cache-dir=/var/cache/bdebstrap",
+        ]
+        with self.assertLogs("bdebstrap", level="INFO"):
+            self.assertEqual(main(args), 0)
+        fingerprint_mock.assert_called_once()
+        restore_mock.assert_called_once_with("0123abcd", "./cached")
+        prepare_output_dir_mock.assert_called_once_with("./cached", False, False)
+        mmdebstrap_call_mock.assert_not_called()
+        config_save_mock.assert_not_called()
+
+    @unittest.mock.patch("bdebstrap.Config.save")
+    @unittest.mock.patch("bdebstrap.prepare_output_dir", side_effect=build_in_place)
+    @unittest.mock.patch("bdebstrap.Mmdebstrap.call")
+    def test_existing_base(
+        self,
+        mmdebstrap_call_mock: unittest.mock.MagicMock,
+        prepare_output_dir_mock: unittest.mock.MagicMock,
+        config_save_mock: unittest.mock.MagicMock,
+    ) -> None:
+        """Test building a derived image on top of an existing base image."""
+        with tempfile.TemporaryDirectory(prefix="bdebstrap-") as tmpdir:
+            create_base(os.path.join(tmpdir, "base"))
+            args = ["-c", os.path.join(TEST_CONFIG_DIR, "derived.yaml"), "-b", tmpdir]
+            with self.assertLogs("bdebstrap", level="INFO") as context_manager:
+                self.assertEqual(main(args), 0)
+        self.assertIn(
+            f"INFO:bdebstrap:Using existing base image '{tmpdir}/base/root.tar'.",
+            context_manager.output,
+        )
+        mmdebstrap_call_mock.assert_called_once_with(f"{tmpdir}/derived", False, unittest.mock.ANY)
+        prepare_output_dir_mock.assert_called_once_with(f"{tmpdir}/derived", False, False)
+        config_save_mock.assert_called_once_with(f"{tmpdir}/derived/config.yaml", False)
+
+    @unittest.mock.patch("bdebstrap.Config.save")
+    @unittest.mock.patch("bdebstrap.prepare_output_dir", side_effect=build_in_place)
+    @unittest.mock.patch("bdebstrap.Mmdebstrap.call")
+    def test_stale_base(
+        self,
+        mmdebstrap_call_mock: unittest.mock.MagicMock,
+        prepare_output_dir_mock: unittest.mock.MagicMock,
+        config_save_mock: unittest.mock.MagicMock,
+    ) -> None:
+        """Test rebuilding an existing base image whose configuration changed."""
+        with tempfile.TemporaryDirectory(prefix="bdebstrap-") as tmpdir:
+            create_base(os.path.join(tmpdir, "base"), suite="bullseye")
+            args = ["-c", os.path.join(TEST_CONFIG_DIR, "derived.yaml"), "-b", tmpdir]
+            with self.assertLogs("bdebstrap", level="INFO") as context_manager:
+                self.assertEqual(main(args), 0)
+        self.assertIn(
+            "INFO:bdebstrap:The configuration of the base image 'base' changed.",
+            context_manager.output,
+        )
+        self.assertEqual(
+            prepare_output_dir_mock.call_args_list,
+            [
+                unittest.mock.call(f"{tmpdir}/base", True, False),
+                unittest.mock.call(f"{tmpdir}/derived", False, False),
+            ],
+        )
+        self.assertEqual(mmdebstrap_call_mock.call_count, 2)
+        self.assertEqual(config_save_mock.call_count, 2)
+
+    @unittest.mock.patch("bdebstrap.Config.save")
+    @unittest.mock.patch("bdebstrap.prepare_output_dir", side_effect=build_in_place)
+    @unittest.mock.patch("bdebstrap.Mmdebstrap.call")
+    def test_force_base(
+        self,
+        mmdebstrap_call_mock: unittest.mock.MagicMock,
+        prepare_output_dir_mock: unittest.mock.MagicMock,
+        config_save_mock: unittest.mock.MagicMock,
+    ) -> None:
+        """Test rebuilding an up-to-date base image with --force."""
+        with tempfile.TemporaryDirectory(prefix="bdebstrap-") as tmpdir:
+            create_base(os.path.join(tmpdir, "base"))
+            args = ["-c", os.path.join(TEST_CONFIG_DIR, "derived.yaml"), "-b", tmpdir, "-f"]
+            with self.assertLogs("bdebstrap", level="INFO"):
+                self.assertEqual(main(args), 0)
+        self.assertEqual(
+            prepare_output_dir_mock.call_args_list,
+            [
+                unittest.mock.call(f"{tmpdir}/base", True, False),
+                unittest.mock.call(f"{tmpdir}/derived", True, False),
+            ],
+        )
+        self.assertEqual(mmdebstrap_call_mock.call_count, 2)
+        self.assertEqual(config_save_mock.call_count, 2)
+
+    @unittest.mock.patch("bdebstrap.Config.save", autospec=True)
+    @unittest.mock.patch("bdebstrap.prepare_output_dir", side_effect=build_in_place)
+    @unittest.mock.patch("bdebstrap.Mmdebstrap.call")
+    def test_batch_base(
+        self,
+        mmdebstrap_call_mock: unittest.mock.MagicMock,
+        prepare_output_dir_mock: unittest.mock.MagicMock,
+        config_save_mock: unittest.mock.MagicMock,
+    ) -> None:
+        """Test building the base image first (and only once) in batch mode."""
+
+        def save_config(config: Config, config_filename: str, *_: typing.Any) -> None:
+            os.makedirs(os.path.dirname(config_filename), exist_ok=True)
+            with open(config_filename, "w", encoding="utf-8") as config_file:
+                config_file.write(config.dumps())
+
+        def create_target(output_dir: str, *_: typing.Any) -> None:
+            with open(os.path.join(output_dir, "root.tar"), "wb"):
+                pass
+
+        config_save_mock.side_effect = save_config
+        mmdebstrap_call_mock.side_effect = create_target
+        derived = os.path.join(TEST_CONFIG_DIR, "derived.yaml")
+        for options in ([], ["--force"]):
+            with self.subTest(options=options):
+                for mock in (mmdebstrap_call_mock, prepare_output_dir_mock, config_save_mock):
+                    mock.reset_mock()
+                stderr = io.StringIO()
+                with tempfile.TemporaryDirectory(prefix="bdebstrap-") as tmpdir:
+                    with contextlib.redirect_stderr(stderr), self.assertLogs("bdebstrap"):
+                        self.assertEqual(main(options + ["-b", tmpdir, "--batch", derived]), 0)
+                summary = stderr.getvalue().splitlines()
+                self.assertEqual(len(summary), 3)
+                self.assertRegex(summary[1], "base.yaml +success +[0-9.]+ seconds$")
+                self.assertRegex(summary[2], "derived.yaml +success +[0-9.]+ seconds$")
+                self.assertEqual(
+                    mmdebstrap_call_mock.call_args_list,
+                    [
+                        unittest.mock.call(f"{tmpdir}/base", False, unittest.mock.ANY),
+                        unittest.mock.call(f"{tmpdir}/derived", False, unittest.mock.ANY),
+                    ],
+                )
+                self.assertEqual(prepare_output_dir_mock.call_count, 2)
+                self.assertEqual(config_save_mock.call_count, 2)
@@ -0,0 +1,120 @@
+# Copyright (C) 2026 Benjamin Drung <bdrung@posteo.de>
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""Test writing the manifest from the dpkg status."""
+
+import os
+import tempfile
+import unittest
+
+from bdebstrap import Config, Mmdebstrap, read_manifest, write_manifest
+
+DPKG_STATUS = """\
+Package: zlib1g
+Status: install ok installed
+Architecture: amd64
+Multi-Arch: same
+Source: zlib (1:1.2.13.dfsg-1)
+Version: 1:1.2.13.dfsg-1
+Installed-Size: 168
+Description: compression library - runtime
+ zlib is a library implementing the deflate compression method found
+ in gzip and PKZIP.
+
+Package: base-files
+Essential: yes
+Status: install ok installed
+Installed-Size: 340
+Architecture: amd64
+Version: 12.4+deb12u5
+Conffiles:
+ /etc/debian_version 4ed1f9bc5ab3e6f3a7bcbd4a3b6a6a3a
+
+Package: old-package
+Status: deinstall ok config-files
+Architecture: all
+Version: 1.0-1
+
+Package: purged-package
+Status: purge ok not-installed
+Architecture: all
+
+Package: libc6
+Status: install ok installed
+Architecture: i386
+Source: glibc
+Version: 2.36-9
+Installed-Size: 12000
+"""
+
+
+class TestManifest(unittest.TestCase):
+    """
+    This unittest class tests writing the manifest from the dpkg status.
+    """
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmpdir.cleanup)
+        self.status = os.path.join(self.tmpdir.name, ".dpkg-status")
+        with open(self.status, "w", encoding="utf-8") as status:
+            status.write(DPKG_STATUS)
+        self.manifest = os.path.join(self.tmpdir.name, "manifest")
+
+    def test_write_manifest(self) -> None:
+        """Test writing the manifest like dpkg-query -W."""
+        write_manifest(self.status, self.manifest)
+        with open(self.manifest, encoding="utf-8") as manifest:
+            self.assertEqual(
+                manifest.read(),
+                "base-files\t12.4+deb12u5\n"
+                "libc6\t2.36-9\n"
+                "old-package\t1.0-1\n"
+                "zlib1g\t1:1.2.13.dfsg-1\n",
+            )
+
+    def test_write_manifest_columns(self) -> None:
+        """Test writing the manifest with additional columns."""
+        write_manifest(self.status, self.manifest, ["source", "architecture", "installed-size"])
+        with open(self.manifest, encoding="utf-8") as manifest:
+            self.assertEqual(
+                manifest.read(),
+                "base-files\t12.4+deb12u5\tbase-files\tamd64\t340\n"
+                "libc6\t2.36-9\tglibc\ti386\t12000\n"
+                "old-package\t1.0-1\told-package\tall\t\n"
+                "zlib1g\t1:1.2.13.dfsg-1\tzlib\tamd64\t168\n",
+            )
+        self.assertEqual(read_manifest(self.manifest)["libc6"], "2.36-9")
+
+    def test_mmdebstrap_write_manifest(self) -> None:
+        """Test Mmdebstrap writing the manifest and removing the dpkg status copy."""
+        config = Config(manifest={"columns": ["architecture"]})
+        Mmdebstrap(config).write_manifest(self.tmpdir.name)
+        self.assertFalse(os.path.exists(self.status))
+        self.assertEqual(
+            read_manifest(self.tmpdir.name),
+            {
+                "base-files": "12.4+deb12u5",
+                "libc6": "2.36-9",
+                "old-package": "1.0-1",
+                "zlib1g": "1:1.2.13.dfsg-1",
+            },
+        )
+
+    def test_check_unsupported_column(self) -> None:
+        """Test Config.check() to fail for an unsupported manifest column."""
+        config = Config(mmdebstrap={}, manifest={"columns": ["maintainer"]})
+        config["name"] = "example"
+        with self.assertRaisesRegex(ValueError, "Unsupported manifest column 'maintainer'"):
+            config.check()
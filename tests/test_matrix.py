@@ -0,0 +1,180 @@
+# Copyright (C) 2026 Benjamin Drung <bdrung@posteo.de>
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""Test the matrix expansion of bdebstrap."""
+
+import argparse
+import contextlib
+import io
+import itertools
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+from bdebstrap import (
+    Config,
+    build_matrix,
+    expand_matrix_variables,
+    load_config,
+    main,
+    parse_args,
+    prepare_base,
+)
+
+from . import build_base
+
+TEST_CONFIG_DIR = os.path.join(os.path.dirname(__file__), "configs")
+
+
+class TestMatrix(unittest.TestCase):
+    """
+    This unittest class tests expanding and building a matrix.
+    """
+
+    def test_matrix_cells(self) -> None:
+        """Test expanding the matrix into one configuration per cell."""
+        config = Config()
+        config.load(os.path.join(TEST_CONFIG_DIR, "matrix.yaml"))
+        config.check()
+        cells = list(config.matrix_cells())
+        self.assertEqual(
+            [cell["name"] for cell in cells],
+            [
+                "debian-bookworm-amd64",
+                "debian-bookworm-arm64",
+                "debian-bookworm-armhf",
+                "debian-trixie-amd64",
+                "debian-trixie-arm64",
+            ],
+        )
+        self.assertEqual(
+            dict(cells[2]),
+            {
+                "name": "debian-bookworm-armhf",
+                "mmdebstrap": {
+                    "architectures": ["armhf"],
+                    "customize-hooks": ['echo "${suite}" > "$1/etc/suite"'],
+                    "mirrors": ["http://deb.debian.org/debian"],
+                    "packages": ["linux-image-armmp"],
+                    "suite": "bookworm",
+                    "target": "root.tar.xz",
+                },
+            },
+        )
+        # The template is left untouched.
+        self.assertEqual(config["mmdebstrap"]["packages"], ["linux-image-{kernel}"])
+
+    def test_name_without_placeholders(self) -> None:
+        """Test appending the axis values to a name without placeholders."""
+        config = Config(matrix={"suite": ["bookworm"], "variant": ["minbase", "buildd"]})
+        config["name"] = "debian"
+        self.assertEqual(
+            [cell["name"] for cell in config.matrix_cells()],
+            ["debian-bookworm-minbase", "debian-bookworm-buildd"],
+        )
+
+    def test_lazy_expansion(self) -> None:
+        """Test that the cells are only expanded when they are requested."""
+        config = Config(matrix={axis: list(range(100)) for axis in ("a", "b", "c")})
+        config["name"] = "image-{a}-{b}-{c}"
+        cells = itertools.islice(config.matrix_cells(), 2)
+        self.assertEqual([cell["name"] for cell in cells], ["image-0-0-0", "image-0-0-1"])
+
+    def test_expand_matrix_variables(self) -> None:
+        """Test keeping shell variables, unknown placeholders, and find's {}."""
+        self.assertEqual(
+            expand_matrix_variables(
+                ['find "$1" -exec rm {} + ${suite} {suite} {unknown}', 42], {"suite": "trixie"}
+            ),
+            ['find "$1" -exec rm {} + ${suite} trixie {unknown}', 42],
+        )
+
+    def test_check_matrix(self) -> None:
+        """Test rejecting an axis without values."""
+        config = Config(matrix={"suite": []})
+        config["name"] = "example"
+        with self.assertRaisesRegex(ValueError, "matrix axis 'suite' needs to be a non-empty"):
+            config.check()
+
+    @unittest.mock.patch("bdebstrap.build_image")
+    def test_build_matrix(self, build_image_mock: unittest.mock.MagicMock) -> None:
+        """Test building all cells and printing the summary."""
+        build_image_mock.side_effect = lambda args, config, *_: (
+            None if config["name"] == "debian-trixie-arm64" else "output"
+        )
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr), self.assertLogs("bdebstrap", "ERROR") as logs:
+            self.assertEqual(main(["-c", os.path.join(TEST_CONFIG_DIR, "matrix.yaml")]), 1)
+        self.assertEqual(
+            [call.args[1]["mmdebstrap"]["suite"] for call in build_image_mock.call_args_list],
+            ["bookworm"] * 3 + ["trixie"] * 2,
+        )
+        self.assertRegex(stderr.getvalue(), r"\ndebian-trixie-arm64 +FAILED +")
+        self.assertEqual(logs.output, ["ERROR:bdebstrap:1 of 5 matrix cells failed."])
+
+    @unittest.mock.patch("bdebstrap.build_image")
+    def test_build_matrix_stdout_target(self, build_image_mock: unittest.mock.MagicMock) -> None:
+        """Test that the cells of a matrix cannot write to standard output."""
+        with tempfile.NamedTemporaryFile("w", suffix=".yaml") as stdout_config:
+            stdout_config.write('mmdebstrap:\n  target: "-"\n')
+            stdout_config.flush()
+            config = os.path.join(TEST_CONFIG_DIR, "matrix.yaml")
+            with contextlib.redirect_stderr(io.StringIO()), self.assertLogs(
+                "bdebstrap", "ERROR"
+            ) as logs:
+                self.assertEqual(main(["-c", config, "-c", stdout_config.name]), 1)
+        build_image_mock.assert_not_called()
+        self.assertEqual(
+            logs.output[0],
+            "ERROR:bdebstrap:debian-bookworm-amd64: "
+            "The target '-' (standard output) cannot be used for a matrix.",
+        )
+        self.assertEqual(logs.output[-1], "ERROR:bdebstrap:5 of 5 matrix cells failed.")
+
+    @unittest.mock.patch("bdebstrap.build", side_effect=build_base)
+    def test_build_matrix_base(self, build_mock: unittest.mock.MagicMock) -> None:
+        """Test building the shared base image of the cells only once (even with --force)."""
+
+        def build_image(
+            args: argparse.Namespace, config: Config, _: float, parents: tuple[str, ...]
+        ) -> str | None:
+            self.assertIsNotNone(prepare_base(args, config, parents))
+            return "output"
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config_filename = os.path.join(tmpdir, "matrix.yaml")
+            with open(config_filename, "w", encoding="utf-8") as config_file:
+                config_file.write(
+                    f"base: {os.path.join(TEST_CONFIG_DIR, 'base.yaml')}\n"
+                    "name: derived-{variant}\n"
+                    "matrix:\n  variant: [minbase, important, standard]\n"
+                    "mmdebstrap:\n  target: root.tar\n  variant: '{variant}'\n"
+                )
+            args = parse_args(["-c", config_filename, "-f", "-b", tmpdir, "-j", "1"])
+            config = load_config(args)
+            assert config is not None
+            with unittest.mock.patch(
+                "bdebstrap.build_image", side_effect=build_image
+            ), contextlib.redirect_stderr(io.StringIO()) as stderr, self.assertLogs("bdebstrap"):
+                self.assertTrue(build_matrix(args, config))
+        build_mock.assert_called_once()
+        self.assertRegex(stderr.getvalue(), r"\n\S*/base.yaml +success +")
+
+    def test_build_matrix_output(self) -> None:
+        """Test that --output cannot be used for a matrix."""
+        with self.assertLogs("bdebstrap", "ERROR") as logs:
+            config = os.path.join(TEST_CONFIG_DIR, "matrix.yaml")
+            self.assertEqual(main(["-c", config, "-o", "/tmp/output"]), 1)
+        self.assertIn("--output cannot be used for a matrix", logs.output[0])
@@ -0,0 +1,131 @@
+# Copyright (C) 2026 Benjamin Drung <bdrung@posteo.de>
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""Test writing the build metrics of bdebstrap."""
+
+import json
+import os
+import re
+import subprocess
+import tempfile
+import unittest
+import unittest.mock
+
+from bdebstrap import Config, Mmdebstrap, build_metrics, main, write_metrics
+
+LABELS = 'name="example",suite="bookworm",architecture="arm64"'
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    This unittest class tests writing the build metrics.
+    """
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_build_metrics(self) -> None:
+        """Test build_metrics() for a successful build."""
+        output_dir = os.path.join(self.tmpdir.name, "example")
+        os.makedirs(output_dir)
+        with open(os.path.join(output_dir, "manifest"), "w", encoding="utf-8") as manifest:
+            manifest.write("base-files\t13.1\nvim\t2:9.0-1\n")
+        downloads_log = os.path.join(self.tmpdir.name, "downloads")
+        with open(downloads_log, "w", encoding="utf-8") as downloads:
+            downloads.write("1000\n234\n")
+        config = Config(mmdebstrap={"architectures": ["arm64", "armhf"], "suite": "bookworm"})
+        config["name"] = "example"
+        samples = build_metrics(config, output_dir, 42.5, 30.25, downloads_log)
+        self.assertEqual(samples[0], f"bdebstrap_build_success{{{LABELS}}} 1")
+        self.assertEqual(samples[1], f"bdebstrap_build_duration_seconds{{{LABELS}}} 42.500")
+        self.assertRegex(samples[2], rf"^bdebstrap_build_timestamp_seconds{{{LABELS}}} \d+\.\d+$")
+        self.assertEqual(
+            samples[3:],
+            [
+                f"bdebstrap_build_cpu_seconds{{{LABELS}}} 30.250",
+                f"bdebstrap_download_size_bytes{{{LABELS}}} 1234",
+                f"bdebstrap_packages{{{LABELS}}} 2",
+                f'bdebstrap_output_size_bytes{{{LABELS},file="manifest"}} 28',
+            ],
+        )
+
+    def test_build_metrics_resources(self) -> None:
+        """Test build_metrics() taking the recorded resource usage."""
+        output_dir = os.path.join(self.tmpdir.name, "example")
+        os.makedirs(output_dir)
+        with open(os.path.join(output_dir, "resources.json"), "w", encoding="utf-8") as resources:
+            json.dump({"usage": {"cpu_seconds": 12.5, "memory_peak_bytes": 4096}}, resources)
+        downloads_log = os.path.join(self.tmpdir.name, "downloads")
+        with open(downloads_log, "w", encoding="utf-8"):
+            pass
+        config = Config(mmdebstrap={"architectures": ["arm64"], "suite": "bookworm"})
+        config["name"] = "example"
+        samples = build_metrics(config, output_dir, 42.5, 30.25, downloads_log)
+        self.assertEqual(samples[3], f"bdebstrap_build_cpu_seconds{{{LABELS}}} 12.500")
+        self.assertIn(f"bdebstrap_build_memory_peak_bytes{{{LABELS}}} 4096", samples)
+        self.assertNotIn(f"bdebstrap_build_io_read_bytes{{{LABELS}}} 0", samples)
+
+    def test_write_metrics(self) -> None:
+        """Test write_metrics() replacing the samples of one image and keeping others."""
+        metrics_file = os.path.join(self.tmpdir.name, "bdebstrap.prom")
+        write_metrics(metrics_file, "one", ['bdebstrap_build_success{name="one"} 1'])
+        write_metrics(
+            metrics_file,
+            "two",
+            ['bdebstrap_packages{name="two"} 7', 'bdebstrap_build_success{name="two"} 0'],
+        )
+        write_metrics(metrics_file, "one", ['bdebstrap_build_success{name="one"} 0'])
+        with open(metrics_file, encoding="utf-8") as metrics:
+            self.assertEqual(
+                metrics.read(),
+                "# HELP bdebstrap_build_success Whether the last build succeeded (1) or "
+                "failed (0).\n"
+                "# TYPE bdebstrap_build_success gauge\n"
+                'bdebstrap_build_success{name="two"} 0\n'
+                'bdebstrap_build_success{name="one"} 0\n'
+                "# HELP bdebstrap_packages Number of installed packages (from the manifest).\n"
+                "# TYPE bdebstrap_packages gauge\n"
+                'bdebstrap_packages{name="two"} 7\n'
+                "# EOF\n",
+            )
+
+    def test_downloads_hook(self) -> None:
+        """Test Mmdebstrap recording the sizes of the downloaded packages."""
+        mmdebstrap = Mmdebstrap(Config(mmdebstrap={"suite": "bookworm"}), downloads_log="/log")
+        parameters = mmdebstrap.construct_parameters("/output")
+        self.assertIn("--skip=essential/unlink", parameters)
+        self.assertIn(
+            '--customize-hook=find "$1/var/cache/apt/archives" -maxdepth 1 -name "*.deb" '
+            '-printf "%s\\n" > "/log"',
+            parameters,
+        )
+
+    @unittest.mock.patch("bdebstrap.Config.save", unittest.mock.MagicMock())
+    @unittest.mock.patch(
+        "bdebstrap.Mmdebstrap.call",
+        unittest.mock.MagicMock(side_effect=subprocess.CalledProcessError(1, "mmdebstrap")),
+    )
+    def test_main_failure(self) -> None:
+        """Test writing the metrics of a failed build."""
+        metrics_file = os.path.join(self.tmpdir.name, "bdebstrap.prom")
+        args = ["-b", self.tmpdir.name, "--name", "failed", "--metrics-file", metrics_file]
+        with self.assertLogs("bdebstrap", level="ERROR"):
+            self.assertEqual(main(args + ["bookworm"]), 1)
+        with open(metrics_file, encoding="utf-8") as metrics:
+            content = metrics.read()
+        labels = 'name="failed",suite="bookworm",architecture="native"'
+        self.assertIn(f"bdebstrap_build_success{{{labels}}} 0\n", content)
+        self.assertRegex(content, re.escape(f"bdebstrap_build_cpu_seconds{{{labels}}} "))
+        self.assertNotIn("bdebstrap_packages", content)
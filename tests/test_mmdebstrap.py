@@ -14,13 +14,15 @@
 
 """Test Mmdebstrap class of bdebstrap."""
 
+import json
 import logging
 import os
+import tempfile
 import unittest
 import unittest.mock
 from unittest.mock import MagicMock
 
-from bdebstrap import Config, Mmdebstrap, __script_name__
+from bdebstrap import Checkpoint, Config, Mmdebstrap, __script_name__
 
 
 class TestMmdebstrap(unittest.TestCase):
@@ -58,8 +60,8 @@ class TestMmdebstrap(unittest.TestCase):
                 "--architectures=i386",
                 '--essential-hook=mkdir -p "$1/tmp/bdebstrap-output"',
                 '--aptopt=Apt::Install-Recommends "true"',
-                "--customize-hook=chroot \"$1\" dpkg-query -f='${Package}\\t${Version}\\n' -W "
-                '> "$1/tmp/bdebstrap-output/manifest"',
+                '--customize-hook=cp "$1/var/lib/dpkg/status" '
+                '"$1/tmp/bdebstrap-output/.dpkg-status"',
                 '--customize-hook=sync-out "/tmp/bdebstrap-output" "/output"',
                 '--customize-hook=rm -rf "$1/tmp/bdebstrap-output"',
                 "unstable",
@@ -78,8 +80,8 @@ class TestMmdebstrap(unittest.TestCase):
                 "mmdebstrap",
                 "--simulate",
                 '--essential-hook=mkdir -p "$1/tmp/bdebstrap-output"',
-                "--customize-hook=chroot \"$1\" dpkg-query -f='${Package}\\t${Version}\\n' -W "
-                '> "$1/tmp/bdebstrap-output/manifest"',
+                '--customize-hook=cp "$1/var/lib/dpkg/status" '
+                '"$1/tmp/bdebstrap-output/.dpkg-status"',
                 '--customize-hook=sync-out "/tmp/bdebstrap-output" "/output"',
                 '--customize-hook=rm -rf "$1/tmp/bdebstrap-output"',
                 "unstable",
@@ -115,8 +117,8 @@ class TestMmdebstrap(unittest.TestCase):
                 '--customize-hook=chroot "$0" update-alternatives --set editor /usr/bin/vim.basic',
                 '--customize-hook=rm -f "$0/etc/udev/rules.d/70-persistent-net.rules"',
                 '--customize-hook=echo "example" > "$1/etc/hostname"',
-                "--customize-hook=chroot \"$1\" dpkg-query -f='${Package}\\t${Version}\\n' -W "
-                '> "$1/tmp/bdebstrap-output/manifest"',
+                '--customize-hook=cp "$1/var/lib/dpkg/status" '
+                '"$1/tmp/bdebstrap-output/.dpkg-status"',
                 '--customize-hook=sync-out "/tmp/bdebstrap-output" "/output"',
                 '--customize-hook=rm -rf "$1/tmp/bdebstrap-output"',
                 "buster",
@@ -154,8 +156,8 @@ class TestMmdebstrap(unittest.TestCase):
                 "--skip=cleanup/apt,update",
                 "--hook-dir=/usr/share/mmdebstrap/hooks/busybox",
                 '--essential-hook=mkdir -p "$1/tmp/bdebstrap-output"',
-                "--customize-hook=chroot \"$1\" dpkg-query -f='${Package}\\t${Version}\\n' -W "
-                '> "$1/tmp/bdebstrap-output/manifest"',
+                '--customize-hook=cp "$1/var/lib/dpkg/status" '
+                '"$1/tmp/bdebstrap-output/.dpkg-status"',
                 '--customize-hook=sync-out "/tmp/bdebstrap-output" "/output"',
                 '--customize-hook=rm -rf "$1/tmp/bdebstrap-output"',
                 "unstable",
@@ -163,6 +165,244 @@ class TestMmdebstrap(unittest.TestCase):
             ],
         )
 
+    def test_base_target(self) -> None:
+        """Test Mmdebstrap installing packages on top of a base image."""
+        mmdebstrap = Mmdebstrap(
+            Config(
+                mmdebstrap={
+                    "packages": ["vim", "?name(ssh)"],
+                    "suite": "bookworm",
+                    "target": "root.tar.xz",
+                    "variant": "minbase",
+                }
+            ),
+            base_target="/output/base/root.tar",
+        )
+        self.assertEqual(
+            mmdebstrap.construct_parameters("/output")[:5],
+            [
+                "mmdebstrap",
+                "--variant=custom",
+                '--setup-hook=tar-in "/output/base/root.tar" /',
+                '--essential-hook=mkdir -p "$1/tmp/bdebstrap-output"',
+                '--customize-hook=chroot "$1" env DEBIAN_FRONTEND=noninteractive '
+                "apt-get install --yes vim '?name(ssh)'",
+            ],
+        )
+
+    def test_write_checkpoint(self) -> None:
+        """Test Mmdebstrap snapshotting the root filesystem before the customize hooks."""
+        checkpoint = Checkpoint("/cache/0123.tar", False)
+        mmdebstrap = Mmdebstrap(
+            Config(
+                mmdebstrap={
+                    "customize-hooks": ["rm -f $1/etc/motd"],
+                    "packages": ["vim"],
+                    "suite": "unstable",
+                    "target": "root.tar",
+                }
+            ),
+            checkpoint=checkpoint,
+        )
+        self.assertEqual(
+            mmdebstrap.construct_parameters("/output")[:5],
+            [
+                "mmdebstrap",
+                "--include=vim",
+                '--essential-hook=mkdir -p "$1/tmp/bdebstrap-output"',
+                f'--customize-hook=tar-out / "{checkpoint.staging}"',
+                "--customize-hook=rm -f $1/etc/motd",
+            ],
+        )
+
+    def test_restore_checkpoint(self) -> None:
+        """Test Mmdebstrap starting from the snapshot and only running the customize hooks."""
+        mmdebstrap = Mmdebstrap(
+            Config(
+                mmdebstrap={
+                    "cleanup-hooks": ["rm -f $1/etc/hostname"],
+                    "customize-hooks": ["rm -f $1/etc/motd"],
+                    "essential-hooks": ["echo essential"],
+                    "packages": ["vim"],
+                    "setup-hooks": ["echo setup"],
+                    "suite": "unstable",
+                    "target": "root.tar",
+                    "variant": "minbase",
+                }
+            ),
+            checkpoint=Checkpoint("/cache/0123.tar", True),
+            downloads_log="/tmp/downloads.log",
+        )
+        self.assertEqual(
+            mmdebstrap.construct_parameters("/output")[:6],
+            [
+                "mmdebstrap",
+                "--variant=custom",
+                '--setup-hook=tar-in "/cache/0123.tar" /',
+                '--essential-hook=mkdir -p "$1/tmp/bdebstrap-output"',
+                "--customize-hook=rm -f $1/etc/motd",
+                "--customize-hook=rm -f $1/etc/hostname",
+            ],
+        )
+
+    @unittest.mock.patch("subprocess.check_call")
+    def test_store_checkpoint(self, check_call_mock: MagicMock) -> None:
+        """Test Mmdebstrap moving the snapshot into place after a successful build."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            checkpoint = Checkpoint(os.path.join(tmpdir, "0123.tar"), False)
+
+            def mmdebstrap(*args: list[str], **kwargs: dict[str, str]) -> None:
+                # pylint: disable=unused-argument
+                with open(checkpoint.staging, "wb"):
+                    pass
+
+            check_call_mock.side_effect = mmdebstrap
+            config = Config(mmdebstrap={"suite": "unstable", "target": "root.tar"})
+            config["name"] = "example"
+            Mmdebstrap(config, checkpoint=checkpoint).call(tmpdir)
+            self.assertEqual(sorted(os.listdir(tmpdir)), ["0123.tar"])
+
+    def test_export_bundle(self) -> None:
+        """Test Mmdebstrap exporting the apt lists and packages before the customize hooks."""
+        config = Config(
+            mmdebstrap={
+                "customize-hooks": ['chroot "$1" apt-get clean'],
+                "skip": ["cleanup/apt"],
+                "suite": "unstable",
+                "target": "-",
+            }
+        )
+        mmdebstrap = Mmdebstrap(config, export_bundle=True)
+        self.assertEqual(
+            mmdebstrap.construct_parameters("/output"),
+            [
+                "mmdebstrap",
+                "--skip=cleanup/apt,essential/unlink",
+                '--essential-hook=mkdir -p "$1/tmp/bdebstrap-output"',
+                '--customize-hook=mkdir -p "$1/tmp/bdebstrap-output/bundle/archives" '
+                '"$1/tmp/bdebstrap-output/bundle/lists"',
+                '--customize-hook=find "$1/var/cache/apt/archives" -maxdepth 1 -name "*.deb" '
+                '-exec cp --link -t "$1/tmp/bdebstrap-output/bundle/archives" {} +',
+                '--customize-hook=find "$1/var/lib/apt/lists" -maxdepth 1 -type f ! -name lock '
+                '-exec cp --link -t "$1/tmp/bdebstrap-output/bundle/lists" {} +',
+                '--customize-hook=chroot "$1" apt-get clean',
+                '--customize-hook=cp "$1/var/lib/dpkg/status" '
+                '"$1/tmp/bdebstrap-output/.dpkg-status"',
+                '--customize-hook=sync-out "/tmp/bdebstrap-output" "/output"',
+                '--customize-hook=rm -rf "$1/tmp/bdebstrap-output"',
+                "unstable",
+                "-",
+            ],
+        )
+
+    def test_replay_bundle(self) -> None:
+        """Test Mmdebstrap taking the apt lists and packages from a bundle."""
+        mmdebstrap = Mmdebstrap(
+            Config(mmdebstrap={"setup-hooks": ["true"], "suite": "unstable", "target": "-"}),
+            replay_bundle="/srv/example/bundle",
+        )
+        self.assertEqual(
+            mmdebstrap.construct_parameters("/output")[:5],
+            [
+                "mmdebstrap",
+                "--skip=update,download/empty",
+                '--setup-hook=sync-in "/srv/example/bundle/lists" /var/lib/apt/lists',
+                '--setup-hook=sync-in "/srv/example/bundle/archives" /var/cache/apt/archives',
+                "--setup-hook=true",
+            ],
+        )
+
+    def test_timings(self) -> None:
+        """Test Mmdebstrap adding hooks that record the timings."""
+        mmdebstrap = Mmdebstrap(
+            Config(
+                mmdebstrap={
+                    "customize-hooks": ["touch $1/foo"],
+                    "suite": "unstable",
+                    "target": "example.tar.xz",
+                }
+            ),
+            timings=True,
+        )
+        log = '>> "/output/.timings.log"'
+        uptime = '$(cut -d " " -f 1 /proc/uptime)'
+        self.assertEqual(
+            mmdebstrap.construct_parameters("/output"),
+            [
+                "mmdebstrap",
+                f'--setup-hook=echo "extract {uptime}" {log}',
+                f'--extract-hook=echo "essential {uptime}" {log}',
+                '--essential-hook=mkdir -p "$1/tmp/bdebstrap-output"',
+                f'--essential-hook=echo "install {uptime}" {log}',
+                f'--customize-hook=echo "customize-hooks:0 {uptime}" {log}',
+                "--customize-hook=touch $1/foo",
+                f'--customize-hook=echo "bdebstrap {uptime}" {log}',
+                '--customize-hook=cp "$1/var/lib/dpkg/status" '
+                '"$1/tmp/bdebstrap-output/.dpkg-status"',
+                '--customize-hook=sync-out "/tmp/bdebstrap-output" "/output"',
+                '--customize-hook=rm -rf "$1/tmp/bdebstrap-output"',
+                f'--customize-hook=echo "output {uptime}" {log}',
+                "unstable",
+                "example.tar.xz",
+            ],
+        )
+
+    def test_timings_simulate(self) -> None:
+        """Test Mmdebstrap not recording timings in simulation mode."""
+        mmdebstrap = Mmdebstrap(Config(mmdebstrap={"suite": "unstable"}), timings=True)
+        self.assertNotIn("/proc/uptime", " ".join(mmdebstrap.construct_parameters("/out", True)))
+
+    def test_write_timings(self) -> None:
+        """Test Mmdebstrap.write_timings() creating timings.json from the log."""
+        mmdebstrap = Mmdebstrap(
+            Config(mmdebstrap={"customize-hooks": ["touch $1/foo", "sleep 2"]}), timings=True
+        )
+        with tempfile.TemporaryDirectory() as output_dir:
+            with open(os.path.join(output_dir, ".timings.log"), "w", encoding="utf-8") as log:
+                log.write(
+                    "extract 101.50\nessential 103.00\ninstall 104.00\n"
+                    "customize-hooks:0 110.00\ncustomize-hooks:1 110.25\n"
+                    "bdebstrap 112.25\noutput 113.00\n"
+                )
+            mmdebstrap.write_timings(output_dir, 100.0, 115.0)
+            self.assertEqual(os.listdir(output_dir), ["timings.json"])
+            with open(os.path.join(output_dir, "timings.json"), encoding="utf-8") as timings:
+                self.assertEqual(
+                    json.load(timings),
+                    {
+                        "duration": 15.0,
+                        "stages": {
+                            "setup": 1.5,
+                            "extract": 1.5,
+                            "essential": 1.0,
+                            "install": 6.0,
+                            "customize-hooks": 2.25,
+                            "bdebstrap": 0.75,
+                            "output": 2.0,
+                        },
+                        "intervals": [
+                            {"name": "setup", "duration": 1.5},
+                            {"name": "extract", "duration": 1.5},
+                            {"name": "essential", "duration": 1.0},
+                            {"name": "install", "duration": 6.0},
+                            {
+                                "name": "customize-hooks",
+                                "duration": 0.25,
+                                "index": 0,
+                                "command": "touch $1/foo",
+                            },
+                            {
+                                "name": "customize-hooks",
+                                "duration": 2.0,
+                                "index": 1,
+                                "command": "sleep 2",
+                            },
+                            {"name": "bdebstrap", "duration": 0.75},
+                            {"name": "output", "duration": 2.0},
+                        ],
+                    },
+                )
+
     @unittest.mock.patch("os.path.exists", unittest.mock.MagicMock(return_value=True))
     @unittest.mock.patch("os.stat")
     @unittest.mock.patch("os.utime")
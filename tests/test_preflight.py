@@ -0,0 +1,174 @@
+# Copyright (C) 2026 Benjamin Drung <bdrung@posteo.de>
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""Test the disk space preflight check of bdebstrap."""
+
+import json
+import os
+import subprocess
+import tempfile
+import typing
+import unittest
+import unittest.mock
+
+from bdebstrap import (
+    check_free_space,
+    estimate_sizes,
+    is_directory_target,
+    main,
+    resolve_package_sizes,
+    target_format,
+)
+
+from . import make_config
+
+PRINT_URIS = """\
+'http://deb.debian.org/debian/pool/main/b/base-files/base-files_13.6_amd64.deb' \
+base-files_13.6_amd64.deb 71564 SHA256:0123
+'http://deb.debian.org/debian/pool/main/t/tzdata/tzdata_2025b-4_all.deb' \
+tzdata_2025b-4_all.deb 263988 SHA256:4567
+"""
+AVAILABLE = """\
+Package: base-files
+Version: 13.6
+Installed-Size: 345
+
+Package: tzdata
+Version: 2025b-4
+Installed-Size: 1224
+"""
+
+
+class TestPreflight(unittest.TestCase):
+    """
+    This unittest class tests estimating the sizes and checking the free space.
+    """
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_resolve_package_sizes(self) -> None:
+        """Test summing the installed and download sizes of the resolved packages."""
+        calls = []
+
+        def run(cmd: list[str], **kwargs: typing.Any) -> subprocess.CompletedProcess[str]:
+            calls.append(cmd)
+            if cmd[0] == "apt-get":
+                return subprocess.CompletedProcess(cmd, 0, stdout=PRINT_URIS)
+            kwargs["stdout"].write(AVAILABLE)
+            return subprocess.CompletedProcess(cmd, 0)
+
+        config = make_config(
+            target="root.tar", variant="essential", architectures=["amd64", "i386"]
+        )
+        with unittest.mock.patch("subprocess.run", side_effect=run):
+            sizes = resolve_package_sizes(config, "/skeleton", self.tmpdir.name)
+        self.assertEqual(sizes, (2, (345 + 1224) * 1024, 71564 + 263988))
+        self.assertEqual(
+            calls[0],
+            [
+                "apt-get",
+                "-o",
+                "Dir=/skeleton",
+                "-o",
+                "Debug::NoLocking=true",
+                "-o",
+                "APT::Install-Recommends=false",
+                "-o",
+                "APT::Architecture=amd64",
+                "-o",
+                "APT::Architectures=amd64,i386",
+                "install",
+                "--print-uris",
+                "-qq",
+                "?essential",
+            ],
+        )
+        self.assertEqual(calls[1][-3:], ["--no-all-versions", "base-files:amd64", "tzdata"])
+
+    def test_estimate_sizes(self) -> None:
+        """Test estimating the output size from the compression of the target."""
+        self.assertEqual(
+            estimate_sizes(make_config(target="root.tar.xz"), 1000, 400),
+            {"output_size_bytes": 250, "tmpdir_size_bytes": 1400},
+        )
+        self.assertEqual(
+            estimate_sizes(make_config(target="root.squashfs"), 1000, 400, export_bundle=True),
+            {"output_size_bytes": 650, "tmpdir_size_bytes": 1400},
+        )
+        self.assertEqual(
+            estimate_sizes(make_config(target="root"), 1000, 400),
+            {"output_size_bytes": 1400, "tmpdir_size_bytes": 0},
+        )
+
+    def test_target_format(self) -> None:
+        """Test determining the target format like mmdebstrap."""
+        self.assertEqual(target_format(make_config(target="root.tar.xz")), "tar")
+        self.assertEqual(target_format(make_config(target="root.tgz")), "tar")
+        self.assertEqual(target_format(make_config(target="-")), "tar")
+        self.assertEqual(target_format(make_config(target="root.sqfs")), "squashfs")
+        self.assertEqual(target_format(make_config(target="root.ext4")), "ext4")
+        self.assertEqual(target_format(make_config(target="/dev/null")), "null")
+        self.assertEqual(target_format(make_config(target="root.tar", format="auto")), "tar")
+        self.assertEqual(target_format(make_config(target="root", format="sqfs")), "squashfs")
+
+    def test_is_directory_target(self) -> None:
+        """Test detecting directory targets (including the dir alias and format auto)."""
+        self.assertTrue(is_directory_target(make_config(target="root")))
+        self.assertTrue(is_directory_target(make_config(target="root", format="auto")))
+        self.assertTrue(is_directory_target(make_config(target="root.tar", format="dir")))
+        self.assertTrue(is_directory_target(make_config(target="root.tar", format="directory")))
+        self.assertFalse(is_directory_target(make_config(target="root.tar.gz", format="auto")))
+        self.assertFalse(is_directory_target(make_config(target="root", format="tar")))
+
+    def test_check_free_space_same_filesystem(self) -> None:
+        """Test adding up the needed space if both directories share one filesystem."""
+        estimate = {"output_size_bytes": 500, "tmpdir_size_bytes": 1000}
+        with unittest.mock.patch("bdebstrap.free_space", return_value=(1, 1500)):
+            self.assertEqual(check_free_space("/tmp", "/output", estimate), [("/tmp", 1800, 1500)])
+        with unittest.mock.patch("bdebstrap.free_space", side_effect=[(1, 1500), (2, 1500)]):
+            self.assertEqual(check_free_space("/tmp", "/output", estimate), [])
+
+    @unittest.mock.patch("subprocess.check_call")
+    @unittest.mock.patch("bdebstrap.simulate_package_sizes", return_value=(1, 1 << 50, 1 << 20))
+    def test_refuse(self, _: unittest.mock.MagicMock, check_call: unittest.mock.MagicMock) -> None:
+        """Test refusing to start the build if the output directory lacks space."""
+        argv = ["--preflight", "--name", "example", "-b", self.tmpdir.name, "--target", "x.tar"]
+        with self.assertLogs("bdebstrap", level="ERROR") as logs:
+            self.assertEqual(main(argv + ["unstable"]), 1)
+        self.assertRegex(logs.output[0], "Preflight: '.*' needs about [0-9]+ MiB for 'example'")
+        check_call.assert_not_called()
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, "example")))
+
+    @unittest.mock.patch("subprocess.check_call")
+    @unittest.mock.patch("bdebstrap.simulate_package_sizes", return_value=(1, 1 << 50, 1 << 20))
+    def test_warn(self, _: unittest.mock.MagicMock, check_call: unittest.mock.MagicMock) -> None:
+        """Test only warning about the lack of space and writing the estimate."""
+        argv = ["--preflight=warn", "--name", "example", "-b", self.tmpdir.name]
+        with self.assertLogs("bdebstrap", level="WARNING"):
+            self.assertEqual(main(argv + ["--target", "x.tar", "unstable"]), 0)
+        check_call.assert_called_once()
+        preflight = os.path.join(self.tmpdir.name, "example", "preflight.json")
+        with open(preflight, encoding="utf-8") as preflight_file:
+            self.assertEqual(
+                json.load(preflight_file),
+                {
+                    "packages": 1,
+                    "installed_size_bytes": 1 << 50,
+                    "download_size_bytes": 1 << 20,
+                    "output_size_bytes": 1 << 50,
+                    "tmpdir_size_bytes": (1 << 50) + (1 << 20),
+                },
+            )
@@ -0,0 +1,168 @@
+# Copyright (C) 2026 Benjamin Drung <bdrung@posteo.de>
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""Test verifying the reproducibility of builds with bdebstrap."""
+
+import argparse
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+import unittest.mock
+
+from bdebstrap import (
+    Config,
+    build_reproducible,
+    compare_outputs,
+    load_config,
+    main,
+    parse_args,
+    prepare_base,
+)
+
+from . import build_base, write_file
+
+TEST_CONFIG_DIR = os.path.join(os.path.dirname(__file__), "configs")
+
+HOSTNAME = b"example\n"
+
+
+def write_tar(path: str, files: dict[str, tuple[bytes, int]]) -> None:
+    """Write a tarball with the given files (content and modification time)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with tarfile.open(path, "w") as tar:
+        for name, (content, mtime) in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            info.mtime = mtime
+            tar.addfile(info, io.BytesIO(content))
+
+
+class TestReproducible(unittest.TestCase):
+    """
+    This unittest class tests comparing the outputs of two builds.
+    """
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmpdir.cleanup)
+        self.first = os.path.join(self.tmpdir.name, "first")
+        self.second = os.path.join(self.tmpdir.name, "second")
+
+    def test_compare_identical(self) -> None:
+        """Test comparing identical outputs (ignoring the skipped files)."""
+        for output_dir, timings in ((self.first, b"{}"), (self.second, b'{"hooks": []}')):
+            write_tar(os.path.join(output_dir, "root.tar"), {"./etc/hostname": (HOSTNAME, 1)})
+            write_file(os.path.join(output_dir, "manifest"), b"vim\t2:9.0-1\n")
+            write_file(os.path.join(output_dir, "timings.json"), timings)
+        self.assertEqual(compare_outputs(self.first, self.second, {"timings.json"}), [])
+
+    def test_compare_tar_entries(self) -> None:
+        """Test listing the differing entries of a tarball."""
+        write_tar(
+            os.path.join(self.first, "root.tar"),
+            {"./etc/hostname": (HOSTNAME, 1), "./etc/machine-id": (b"1\n", 1)},
+        )
+        write_tar(
+            os.path.join(self.second, "root.tar"),
+            {"./etc/hostname": (HOSTNAME, 2), "./etc/machine-id": (b"2\n", 1)},
+        )
+        write_file(os.path.join(self.first, "manifest"), b"vim\t2:9.0-1\n")
+        write_file(os.path.join(self.second, "vmlinuz"), b"kernel")
+        self.assertEqual(
+            compare_outputs(self.first, self.second, set()),
+            [
+                "manifest: only in the first build",
+                "root.tar: etc/hostname: differs in mtime (1 != 2)",
+                "root.tar: etc/machine-id: differs in content",
+                "vmlinuz: only in the second build",
+            ],
+        )
+
+    def test_compare_directory(self) -> None:
+        """Test comparing a directory target entry by entry."""
+        for output_dir, content in ((self.first, HOSTNAME), (self.second, b"other\n")):
+            write_file(os.path.join(output_dir, "root", "etc", "hostname"), content)
+            write_file(os.path.join(output_dir, "root", "etc", "issue"), b"Debian\n")
+            os.utime(os.path.join(output_dir, "root", "etc", "issue"), (1, 1))
+        os.chmod(os.path.join(self.second, "root", "etc", "issue"), 0o600)
+        self.assertEqual(
+            compare_outputs(self.first, self.second, set(), ("root",)),
+            [
+                "root/etc/hostname: differs in size (8 != 6), content",
+                "root/etc/issue: differs in mode (420 != 384)",
+            ],
+        )
+
+    def test_verify_reproducible(self) -> None:
+        """Test building twice with the same SOURCE_DATE_EPOCH and comparing the outputs."""
+        calls = []
+
+        def build_image(args: argparse.Namespace, config: Config, *_: object) -> str | None:
+            calls.append((args.tmpdir, args.cache_dir, config.source_date_epoch))
+            output_dir = args.output or os.path.join(args.output_base_dir, config["name"])
+            mtime = 1 if len(calls) == 1 else 2
+            write_tar(os.path.join(output_dir, "root.tar"), {"./etc/hostname": (HOSTNAME, mtime)})
+            return str(output_dir)
+
+        with unittest.mock.patch(
+            "bdebstrap.build_image", side_effect=build_image
+        ), self.assertLogs("bdebstrap", level="ERROR") as logs:
+            argv = ["--verify-reproducible", "--name", "example", "-b", self.tmpdir.name]
+            self.assertEqual(
+                main(argv + ["--cache-dir", "cache", "--target", "root.tar", "unstable"]), 1
+            )
+        self.assertEqual(len(calls), 2)
+        self.assertNotEqual(calls[0][0], calls[1][0])
+        self.assertEqual([call[1] for call in calls], [None, None])
+        self.assertEqual(calls[0][2], calls[1][2])
+        self.assertIn("Not reproducible: root.tar: etc/hostname: differs in mtime", logs.output[0])
+        self.assertRegex(
+            logs.output[1], "The second build is kept in '.*/\\.example\\.reproducible"
+        )
+
+    @unittest.mock.patch("bdebstrap.build", side_effect=build_base)
+    def test_verify_reproducible_force_base(self, build_mock: unittest.mock.MagicMock) -> None:
+        """Test that --force rebuilds the base image only once for both builds."""
+
+        def build_image(
+            args: argparse.Namespace,
+            config: Config,
+            _: float,
+            parents: tuple[str, ...],
+            *__: object
+        ) -> str | None:
+            self.assertTrue(args.force)
+            self.assertIsNotNone(prepare_base(args, config, parents))
+            output_dir = args.output or os.path.join(args.output_base_dir, config["name"])
+            write_tar(os.path.join(output_dir, "root.tar"), {"./etc/hostname": (HOSTNAME, 1)})
+            return str(output_dir)
+
+        derived = os.path.join(TEST_CONFIG_DIR, "derived.yaml")
+        args = parse_args(["-c", derived, "-f", "-b", self.tmpdir.name, "--target", "root.tar"])
+        config = load_config(args)
+        assert config is not None
+        with unittest.mock.patch("bdebstrap.build_image", side_effect=build_image):
+            with self.assertLogs("bdebstrap", level="INFO"):
+                output_dir = build_reproducible(args, config, 0.0)
+        self.assertEqual(output_dir, os.path.join(self.tmpdir.name, "derived"))
+        build_mock.assert_called_once()
+
+    def test_verify_reproducible_target_outside(self) -> None:
+        """Test that the target needs to be placed in the output directory."""
+        with self.assertLogs("bdebstrap", level="ERROR") as logs:
+            argv = ["--verify-reproducible", "--name", "example", "-b", self.tmpdir.name]
+            self.assertEqual(main(argv + ["--target", "/tmp/root.tar", "unstable"]), 1)
+        self.assertIn("target '/tmp/root.tar' is not placed in the output", logs.output[0])
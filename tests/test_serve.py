@@ -0,0 +1,175 @@
+# Copyright (C) 2026 Benjamin Drung <bdrung@posteo.de>
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""Test the build daemon (serve and submit subcommands) of bdebstrap."""
+
+import contextlib
+import hashlib
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import unittest.mock
+
+from bdebstrap import BuildServer, main, parse_submit_args
+
+BDEBSTRAP = os.path.join(os.path.dirname(__file__), "..", "bdebstrap")
+
+
+class TestServe(unittest.TestCase):
+    """
+    This unittest class tests the build daemon and its client.
+    """
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmpdir.cleanup)
+        self.socket_path = os.path.join(self.tmpdir.name, "bdebstrap.sock")
+
+    def _client(self) -> tuple[socket.socket, socket.socket]:
+        """Return a connected pair of sockets (for the daemon and for the client)."""
+        server_side, client_side = socket.socketpair()
+        self.addCleanup(server_side.close)
+        self.addCleanup(client_side.close)
+        return server_side, client_side
+
+    def test_submit_deduplicates(self) -> None:
+        """Test attaching identical requests to the queued job."""
+        server = BuildServer(self.socket_path, 0)
+        request = {"argv": ["verify", "output"], "cwd": self.tmpdir.name, "env": {}}
+        first, first_client = self._client()
+        second, second_client = self._client()
+        third, third_client = self._client()
+        job = server.submit(request, first)
+        self.assertIs(server.submit(dict(request), second), job)
+        other = server.submit(dict(request, cwd="/"), third)
+        self.assertIsNot(other, job)
+        self.assertEqual(list(server.queue), [job, other])
+        self.assertEqual([client.socket for client in job.clients], [first, second])
+        replies = [json.loads(c.recv(1024)) for c in (first_client, second_client, third_client)]
+        self.assertEqual(
+            replies,
+            [
+                {"event": "queued", "position": 1, "attached": False},
+                {"event": "queued", "position": 1, "attached": True},
+                {"event": "queued", "position": 2, "attached": False},
+            ],
+        )
+
+    def test_submit_deduplicates_environment(self) -> None:
+        """Test ignoring session environment variables when comparing requests."""
+        server = BuildServer(self.socket_path, 0)
+        env = {"PATH": "/usr/bin", "PWD": "/home/user", "SHLVL": "1"}
+        request = {"argv": ["verify", "output"], "cwd": self.tmpdir.name, "env": env}
+        job = server.submit(request, self._client()[0])
+        other_shell = dict(env, PWD="/tmp", SHLVL="2", OLDPWD="/home/user")
+        self.assertIs(server.submit(dict(request, env=other_shell), self._client()[0]), job)
+        other_path = dict(env, PATH="/usr/local/bin:/usr/bin")
+        self.assertIsNot(server.submit(dict(request, env=other_path), self._client()[0]), job)
+
+    def test_history_limit(self) -> None:
+        """Test that the history is dropped once it exceeds the limit."""
+        server = BuildServer(self.socket_path, 0)
+        request = {"argv": ["verify", "output"], "cwd": self.tmpdir.name, "env": {}}
+        server_side, _ = self._client()
+        job = server.submit(request, server_side)
+        job.clients.clear()
+        with unittest.mock.patch("bdebstrap.SERVE_HISTORY_LIMIT", 100):
+            job.broadcast({"event": "output", "data": "x" * 50})
+            self.assertEqual(len(job.history or []), 1)
+            job.broadcast({"event": "output", "data": "x" * 50})
+        self.assertIsNone(job.history)
+        job.broadcast({"event": "output", "data": "x" * 50})
+        self.assertIsNone(job.history)
+
+    def test_slow_client(self) -> None:
+        """Test buffering the output for a slow client and disconnecting it on overflow."""
+        server = BuildServer(self.socket_path, 0)
+        request = {"argv": ["verify", "output"], "cwd": self.tmpdir.name, "env": {}}
+        slow, _ = self._client()
+        fast, fast_client = self._client()
+        job = server.submit(request, slow)
+        server.submit(dict(request), fast)
+        fast_client.setblocking(False)
+        chunk = {"event": "output", "data": "x" * (1 << 16)}
+        with unittest.mock.patch("bdebstrap.SERVE_CLIENT_BUFFER_LIMIT", 1 << 20):
+            for _ in range(64):
+                job.broadcast(chunk)
+                # Only the fast client reads its output.
+                with contextlib.suppress(BlockingIOError):
+                    while fast_client.recv(1 << 20):
+                        pass
+        self.assertEqual([client.socket for client in job.clients], [fast])
+        self.assertEqual(slow.fileno(), -1)
+
+    def test_parse_submit_args(self) -> None:
+        """Test passing all unknown arguments through to bdebstrap."""
+        args = parse_submit_args(["-q", "--socket", self.socket_path, "-c", "a.yaml", "unstable"])
+        self.assertEqual(args.socket, self.socket_path)
+        self.assertEqual(args.argv, ["-q", "-c", "a.yaml", "unstable"])
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr), self.assertRaises(SystemExit):
+            parse_submit_args(["serve"])
+        self.assertIn("The serve subcommand cannot be submitted.", stderr.getvalue())
+
+    def test_submit_without_daemon(self) -> None:
+        """Test submitting a job without a running daemon."""
+        with self.assertLogs("bdebstrap", level="ERROR") as logs:
+            self.assertEqual(main(["submit", "--socket", self.socket_path, "verify", "out"]), 1)
+        self.assertIn("Failed to submit the job", logs.output[0])
+
+    def test_serve_and_submit(self) -> None:
+        """Test running a job in the daemon and streaming its output back."""
+        output_dir = os.path.join(self.tmpdir.name, "output")
+        os.makedirs(output_dir)
+        with open(os.path.join(output_dir, "manifest"), "wb") as manifest:
+            manifest.write(b"vim\t2:9.0-1\n")
+        checksum = hashlib.sha256(b"vim\t2:9.0-1\n").hexdigest()
+        with open(os.path.join(output_dir, "SHA256SUMS"), "w", encoding="utf-8") as checksums:
+            checksums.write(f"{checksum}  manifest\n")
+
+        # pylint: disable-next=consider-using-with
+        server = subprocess.Popen(
+            [sys.executable, BDEBSTRAP, "serve", "--socket", self.socket_path, "-j", "2"],
+            stderr=subprocess.PIPE,
+        )
+        self.addCleanup(server.wait)
+        self.addCleanup(server.terminate)
+        for _ in range(100):
+            if os.path.exists(self.socket_path):
+                break
+            time.sleep(0.05)
+        self.assertEqual(os.stat(self.socket_path).st_mode & 0o077, 0)
+
+        submit = [sys.executable, BDEBSTRAP, "submit", "--socket", self.socket_path, "verify"]
+        process = subprocess.run(
+            submit + ["output"], capture_output=True, check=False, cwd=self.tmpdir.name
+        )
+        self.assertEqual(process.stdout, b"output: OK\n")
+        self.assertEqual(process.returncode, 0)
+        process = subprocess.run(
+            submit + ["missing"], capture_output=True, check=False, cwd=self.tmpdir.name
+        )
+        self.assertRegex(process.stdout, b"^Failed to read SHA256SUMS: .*\nmissing: FAILED\n$")
+        self.assertEqual(process.returncode, 1)
+
+        server.terminate()
+        _, stderr = server.communicate()
+        self.assertIn(b"Finished job verify output with exit code 0.", stderr)
+        self.assertFalse(os.path.exists(self.socket_path))
@@ -0,0 +1,45 @@
+# Copyright (C) 2026 Benjamin Drung <bdrung@posteo.de>
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""Test the startup of bdebstrap."""
+
+import os
+import subprocess
+import sys
+import unittest
+
+# Modules that are slow to import and only needed by some code paths
+LAZY_MODULES = ["concurrent.futures", "multiprocessing", "ruamel.yaml", "urllib.request"]
+
+
+class TestStartup(unittest.TestCase):
+    """
+    This unittest class tests that the startup of bdebstrap stays fast.
+    """
+
+    def test_lazy_imports(self) -> None:
+        """Test that importing bdebstrap does not import the heavy modules."""
+        top_dir = os.path.join(os.path.dirname(__file__), "..")
+        code = (
+            "import sys, bdebstrap\n"
+            f"print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+        )
+        process = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            check=True,
+            cwd=top_dir,
+            text=True,
+        )
+        self.assertEqual(process.stdout.strip(), "")
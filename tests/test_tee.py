@@ -0,0 +1,109 @@
+# Copyright (C) 2026 Benjamin Drung <bdrung@posteo.de>
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""Test passing the tar stream on standard output to multiple sinks."""
+
+import hashlib
+import logging
+import os
+import subprocess
+import tempfile
+import unittest
+import unittest.mock
+
+from bdebstrap import Config, Mmdebstrap, __script_name__, fan_out
+
+from . import make_config
+
+
+def tee_config(**tee: str | bool) -> Config:
+    """Return a configuration that writes the target to stdout with the given tee settings."""
+    config = make_config(suite="bookworm", target="-")
+    config["tee"] = tee
+    return config
+
+
+class TestTee(unittest.TestCase):
+    """
+    This unittest class tests passing the tar stream to multiple sinks.
+    """
+
+    def setUp(self) -> None:
+        logging.getLogger(__script_name__).setLevel(logging.WARNING)
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_fan_out(self) -> None:
+        """Test fan_out() passing the same data to all sinks despite a failing one."""
+        first: list[bytes] = []
+        second: list[bytes] = []
+
+        def fail(_: bytes) -> None:
+            raise OSError("No space left on device")
+
+        with open("/dev/zero", "rb") as zero, subprocess.Popen(
+            ["head", "-c", "3000000"], stdin=zero, stdout=subprocess.PIPE
+        ) as process:
+            assert process.stdout is not None
+            errors = fan_out(process.stdout, [first.append, fail, second.append])
+        self.assertEqual(b"".join(first), b"\0" * 3000000)
+        self.assertEqual(first, second)
+        self.assertIsNone(errors[0])
+        self.assertIsInstance(errors[1], OSError)
+        self.assertIsNone(errors[2])
+
+    def test_call_tee(self) -> None:
+        """Test Mmdebstrap passing the tar stream to a file, a checksum, and a command."""
+        output_dir = self.tmpdir.name
+        command_output = os.path.join(output_dir, "command-output")
+        mmdebstrap = Mmdebstrap(
+            tee_config(
+                checksum="sha256",
+                command=f"cat > {command_output}",
+                file="root.tar",
+                stdout=False,
+            )
+        )
+        with unittest.mock.patch.object(
+            mmdebstrap, "construct_parameters", return_value=["printf", "tar stream"]
+        ):
+            mmdebstrap.call(output_dir)
+        for path in ("root.tar", "command-output"):
+            with open(os.path.join(output_dir, path), "rb") as output:
+                self.assertEqual(output.read(), b"tar stream")
+        with open(os.path.join(output_dir, "target.sha256"), encoding="utf-8") as checksum:
+            self.assertEqual(
+                checksum.read(), f"{hashlib.sha256(b'tar stream').hexdigest()}  root.tar\n"
+            )
+
+    def test_call_tee_command_failure(self) -> None:
+        """Test Mmdebstrap raising an error if the tee command fails."""
+        mmdebstrap = Mmdebstrap(tee_config(command="cat > /dev/null; exit 3", stdout=False))
+        with unittest.mock.patch.object(
+            mmdebstrap, "construct_parameters", return_value=["printf", "tar stream"]
+        ):
+            with self.assertLogs(__script_name__, level="ERROR"):
+                with self.assertRaises(subprocess.CalledProcessError) as context:
+                    mmdebstrap.call(self.tmpdir.name)
+        self.assertEqual(context.exception.returncode, 3)
+
+    def test_check_checksum(self) -> None:
+        """Test Config.check() rejecting unsupported checksum algorithms."""
+        with self.assertRaisesRegex(ValueError, "Unsupported checksum algorithm 'crc32'"):
+            tee_config(checksum="crc32").check()
+
+    def test_check_stdout_type(self) -> None:
+        """Test Config.check() rejecting a non-boolean stdout option."""
+        with self.assertRaisesRegex(ValueError, "for tee option 'stdout'. Excepted: boolean."):
+            tee_config(stdout="yes").check()
@@ -0,0 +1,126 @@
+# Copyright (C) 2026 Benjamin Drung <bdrung@posteo.de>
+#
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+#
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+"""Test the automatic selection of the temporary directory (--tmpdir=auto)."""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+import unittest.mock
+
+from bdebstrap import (
+    BUILD_SIZE_FILENAME,
+    Config,
+    Mmdebstrap,
+    auto_tmpdir,
+    filesystem_type,
+    read_build_size,
+)
+
+
+class TestAutoTmpdir(unittest.TestCase):
+    """
+    This unittest class tests placing builds on tmpfs or on disk.
+    """
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.tmpdir.cleanup)
+        for target, value in (
+            ("bdebstrap.TMPFS_DIR", self.tmpdir.name),
+            ("bdebstrap.filesystem_type", unittest.mock.MagicMock(return_value="ext4")),
+            ("bdebstrap.memory_available", unittest.mock.MagicMock(return_value=3 << 20)),
+            ("bdebstrap.memory_pressure", unittest.mock.MagicMock(return_value=0.5)),
+        ):
+            patcher = unittest.mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _reservations(self) -> dict[str, int]:
+        ledger = os.path.join(self.tmpdir.name, f".bdebstrap-reservations-{os.getuid()}.json")
+        with open(ledger, encoding="utf-8") as ledger_file:
+            reservations: dict[str, int] = json.load(ledger_file)
+        return reservations
+
+    def test_without_recorded_size(self) -> None:
+        """Test building on disk if there is no recorded build size."""
+        with auto_tmpdir("example", None) as tmpdir:
+            self.assertIsNone(tmpdir)
+
+    def test_tmpfs_with_concurrent_builds(self) -> None:
+        """Test that the reservations of concurrent builds are taken into account."""
+        with auto_tmpdir("first", 1 << 20) as tmpdir:
+            self.assertEqual(tmpdir, self.tmpdir.name)
+            self.assertEqual(list(self._reservations().values()), [1310720])
+            results = []
+
+            def concurrent_build(size: int) -> None:
+                with auto_tmpdir("second", size) as second_tmpdir:
+                    results.append(second_tmpdir)
+
+            for size in (2 << 20, 1 << 20):
+                thread = threading.Thread(target=concurrent_build, args=(size,))
+                thread.start()
+                thread.join()
+            # Only the second one fits into the memory beside the first build.
+            self.assertEqual(results, [None, self.tmpdir.name])
+        self.assertEqual(self._reservations(), {})
+
+    def test_memory_pressure(self) -> None:
+        """Test building on disk if the system is under memory pressure."""
+        with unittest.mock.patch(
+            "bdebstrap.memory_pressure", unittest.mock.MagicMock(return_value=42.0)
+        ), self.assertLogs("bdebstrap", level="INFO") as logs:
+            with auto_tmpdir("example", 1 << 20) as tmpdir:
+                self.assertIsNone(tmpdir)
+        self.assertIn("Memory pressure is 42.0 %. Building on disk.", logs.output[0])
+
+    def test_disk_fallback_for_tmpfs_tmp(self) -> None:
+        """Test falling back to /var/tmp if the default temporary directory is a tmpfs."""
+        with unittest.mock.patch(
+            "bdebstrap.filesystem_type", unittest.mock.MagicMock(return_value="tmpfs")
+        ), auto_tmpdir("example", 1 << 30) as tmpdir:
+            self.assertEqual(tmpdir, "/var/tmp")
+
+    def test_read_build_size(self) -> None:
+        """Test reading the recorded build size of the previous build."""
+        self.assertIsNone(read_build_size(self.tmpdir.name))
+        with open(os.path.join(self.tmpdir.name, BUILD_SIZE_FILENAME), "w", encoding="utf-8") as f:
+            f.write("123456\n")
+        self.assertEqual(read_build_size(self.tmpdir.name), 123456)
+
+
+class TestBuildSize(unittest.TestCase):
+    """
+    This unittest class tests recording the build size.
+    """
+
+    def test_filesystem_type(self) -> None:
+        """Test looking up the filesystem type of the mount point of a path."""
+        self.assertEqual(filesystem_type("/proc/self"), "proc")
+
+    def test_record_size(self) -> None:
+        """Test recording the size of the chroot at the end of the build."""
+        config = Config(mmdebstrap={"suite": "unstable", "target": "root.tar"})
+        config["name"] = "example"
+        cmd = Mmdebstrap(config, record_size=True).construct_parameters("/output")
+        self.assertIn(
+            '--customize-hook=du -sx --block-size=1 "$1" | cut -f 1 '
+            '> "$1/tmp/bdebstrap-output/.build-size"',
+            cmd,
+        )
+        cmd = Mmdebstrap(config, record_size=True).construct_parameters("/output", simulate=True)
+        self.assertFalse([parameter for parameter in cmd if "du -sx" in parameter])